@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+STUBS_DIR = os.path.join(BENCHMARKS_DIR, "stubs")
+
+
+def use_stub_utils():
+    # run against the stand-in reuther_digitization_utils unless --real-utils is given
+    sys.path.insert(0, STUBS_DIR)
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [STUBS_DIR, os.environ.get("PYTHONPATH")]))
+
+
+def get_git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Timer:
+    def __init__(self):
+        self.results = {}
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        yield
+        self.results[name] = time.perf_counter() - start
+
+
+def write_config(config_path, output_dir, derivative_mode):
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write("\n".join([
+            "[defaults]",
+            f"output_dir={output_dir}",
+            f"scan_storage_location={os.path.join(output_dir, 'hold')}",
+            "generate_derivatives=True",
+            "derivative_type=jp2",
+            f"derivative_mode={derivative_mode}",
+            f"worker_processes={os.cpu_count() or 1}",
+            ""
+        ]))
+
+
+def mark_renamed(project_id):
+    from reuther_digitization_client.config import get_db_path
+    connection = sqlite3.connect(get_db_path())
+    connection.execute("UPDATE items SET rename=1 WHERE project_id=?", (project_id,))
+    connection.commit()
+    connection.close()
+
+
+def benchmark_size(app, size, args):
+    from PyQt5.QtCore import QObject, QThreadPool
+
+    from benchmarks.synthetic import generate_project
+    from reuther_digitization_client.config import load_config
+    from reuther_digitization_client.database import DEFAULT_CONNECTION, close_connection, create_connection, create_project, get_projects
+    from reuther_digitization_client.db_writer import DatabaseWriter
+    from reuther_digitization_client.helpers import ImportWorker
+    from reuther_digitization_client.items_window import Items
+    from reuther_digitization_utils.project_utils import ProjectUtils
+    from scripts.batch_generate_derivatives import batch_generate_derivatives
+
+    class BenchmarkClient(QObject):
+        # the parts of DigitizationClient that the Items window relies on
+        def __init__(self, config):
+            super().__init__()
+            self.config = config
+            self.threadpool = QThreadPool()
+            self.db_writer = DatabaseWriter()
+
+        def show_projects(self):
+            pass
+
+        def schedule_metrics_export(self):
+            pass
+
+    timer = Timer()
+    with tempfile.TemporaryDirectory(prefix=f"reuther-bench-{size}-") as temp_dir:
+        os.environ["REUTHER_DIGITIZATION_DB"] = os.path.join(temp_dir, "digitization_client.sqlite")
+        collection_id = f"bench{size}"
+        with timer.measure("generate_synthetic_project"):
+            csv_path, output_dir = generate_project(
+                temp_dir, collection_id, size,
+                pages_per_item=args.pages, page_size=args.page_size,
+                scanned_items=min(size, args.scanned_items)
+            )
+        os.environ["REUTHER_DIGITIZATION_CONFIG"] = os.path.join(temp_dir, "config.cfg")
+        write_config(os.environ["REUTHER_DIGITIZATION_CONFIG"], output_dir, args.derivative_mode)
+        if not create_connection():
+            sys.exit("Could not open the benchmark database")
+
+        with timer.measure("import_project"):
+            project = ProjectUtils(output_dir, csv_path)
+            project_id = create_project(project.collection_id, collection_id, project.collection_dir)
+            worker = ImportWorker(project, project_id)
+            worker.run()
+        with timer.measure("get_projects"):
+            get_projects()
+
+        client = BenchmarkClient(load_config())
+        items_window = Items(client)
+        with timer.measure("load_items"):
+            items_window.load_items(project_id, project.collection_dir)
+            app.processEvents()
+        with timer.measure("fetch_all_items"):
+            items_window.model.fetch_all()
+            app.processEvents()
+        boxes = sorted(set(item["box"] for item in items_window.model.items))
+        items_window.value_filters[1] = set(boxes[::2])
+        with timer.measure("filter_items"):
+            items_window.filterdata()
+            app.processEvents()
+        items_window.titleSearchEdit.setText("1950")
+        with timer.measure("search_titles"):
+            items_window.filterdata()
+            app.processEvents()
+
+        items_window.deleteLater()
+        client.db_writer.shutdown()
+        app.processEvents()
+        mark_renamed(project_id)
+        with timer.measure("batch_generate_derivatives"):
+            # the script reports every item and exits with an error if any item failed
+            with contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    batch_generate_derivatives(project.collection_id, jobs=args.jobs)
+                except SystemExit:
+                    pass
+        close_connection(DEFAULT_CONNECTION)
+        del os.environ["REUTHER_DIGITIZATION_DB"]
+        del os.environ["REUTHER_DIGITIZATION_CONFIG"]
+    return timer.results
+
+
+def compare(report, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline.get('git_commit')}):")
+    for size, results in report["results"].items():
+        baseline_results = baseline["results"].get(size, {})
+        for name, seconds in results.items():
+            baseline_seconds = baseline_results.get(name)
+            if baseline_seconds:
+                change = (seconds - baseline_seconds) / baseline_seconds * 100
+                print(f"  {size:>7} items  {name:<28} {baseline_seconds:9.3f}s -> {seconds:9.3f}s  {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the digitization client against synthetic projects")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Number of items per synthetic project")
+    parser.add_argument("--pages", type=int, default=2, help="Preservation scans per item")
+    parser.add_argument("--page-size", type=int, default=4096, help="Bytes per dummy preservation scan")
+    parser.add_argument("--scanned-items", type=int, default=200, help="Maximum number of items given dummy scans")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Jobs passed to batch_generate_derivatives")
+    parser.add_argument("--derivative-mode", choices=["item", "pages"], default="item", help="derivative_mode used for batch derivative generation")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Compare against a previous JSON report")
+    parser.add_argument("--real-utils", action="store_true", help="Use the installed reuther_digitization_utils instead of the stand-in")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if not args.real_utils:
+        use_stub_utils()
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+
+    report = {
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {"pages": args.pages, "page_size": args.page_size, "scanned_items": args.scanned_items, "jobs": args.jobs, "derivative_mode": args.derivative_mode, "real_utils": args.real_utils},
+        "results": {}
+    }
+    for size in args.sizes:
+        results = benchmark_size(app, size, args)
+        report["results"][str(size)] = results
+        for name, seconds in results.items():
+            print(f"{size:>7} items  {name:<28} {seconds:9.3f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
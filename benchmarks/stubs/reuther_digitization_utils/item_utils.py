@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import time
+
+
+# Stand-in for reuther_digitization_utils.item_utils used by the benchmarks.
+# Each task sleeps for a configurable delay and does real file I/O so that
+# the client's scheduling and bookkeeping can be measured without the
+# imaging dependencies. Settings come from the environment so that worker
+# processes pick them up too.
+DEFAULT_SETTINGS = {
+    "delays": {"rename": 0.0, "derivatives": 0.0, "copy": 0.0, "complete": 0.0},
+    "derivative_bytes": 4096
+}
+
+
+def get_settings():
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(json.loads(os.environ.get("REUTHER_BENCH_ITEM_UTILS", "{}")))
+    return settings
+
+
+class ItemUtils:
+    def __init__(self, project_dir, item_identifier, remote_scans_dir=None):
+        self.project_dir = project_dir
+        self.item_identifier = item_identifier
+        self.remote_scans_dir = remote_scans_dir
+        self.item_dir = os.path.join(project_dir, item_identifier)
+        self.preservation_dir = os.path.join(self.item_dir, "preservation")
+        self.settings = get_settings()
+
+    def delay(self, task):
+        time.sleep(self.settings["delays"].get(task, 0.0))
+
+    def get_tiff_filepaths(self):
+        if not os.path.exists(self.preservation_dir):
+            return []
+        filenames = sorted(filename for filename in os.listdir(self.preservation_dir) if filename.endswith(".tif"))
+        return [os.path.join(self.preservation_dir, filename) for filename in filenames]
+
+    def rename_preservation_scans(self):
+        self.delay("rename")
+        return f"{len(self.get_tiff_filepaths())} files"
+
+    def generate_derivatives(self):
+        self.delay("derivatives")
+        derivative_dir = os.path.join(self.item_dir, "derivatives")
+        os.makedirs(derivative_dir, exist_ok=True)
+        for filepath in self.get_tiff_filepaths():
+            with open(filepath, "rb") as f:
+                f.read()
+            derivative_filename = os.path.splitext(os.path.basename(filepath))[0] + ".jp2"
+            with open(os.path.join(derivative_dir, derivative_filename), "wb") as f:
+                f.write(b"\0" * self.settings["derivative_bytes"])
+        return "derivatives generated"
+
+    def copy_item_to_remote_dir(self):
+        self.delay("copy")
+        shutil.copytree(self.item_dir, os.path.join(self.remote_scans_dir, self.item_identifier), dirs_exist_ok=True)
+        return "copied"
+
+    def check_complete(self):
+        self.delay("complete")
+        return "complete"
@@ -0,0 +1,19 @@
+import csv
+import os
+
+
+# Stand-in for reuther_digitization_utils.project_utils that reads the CSVs
+# written by benchmarks.synthetic.
+class ProjectUtils:
+    def __init__(self, output_dir, project_csv):
+        self.output_dir = output_dir
+        self.items = []
+        with open(project_csv, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.collection_id = row["collection_id"]
+                self.items.append(row)
+        self.collection_dir = os.path.join(output_dir, self.collection_id)
+
+    def setup_project(self):
+        for item in self.items:
+            os.makedirs(os.path.join(self.collection_dir, item["item_identifier"], "preservation"), exist_ok=True)
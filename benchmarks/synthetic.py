@@ -0,0 +1,74 @@
+import csv
+import math
+import os
+import struct
+
+
+def write_project_csv(csv_path, collection_id, item_count, items_per_box=50):
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        fieldnames = ["collection_id", "item_identifier", "title", "dates", "box", "folder", "uri"]
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for i in range(item_count):
+            writer.writerow({
+                "collection_id": collection_id,
+                "item_identifier": f"{collection_id}_{i + 1:06d}",
+                "title": f"Correspondence, {1900 + i % 100}",
+                "dates": f"{1900 + i % 100}",
+                "box": str(i // items_per_box + 1),
+                "folder": str(i % items_per_box + 1),
+                "uri": f"/repositories/2/archival_objects/{i + 1}"
+            })
+
+
+def make_tiff(page_size):
+    # an uncompressed 8-bit grayscale TIFF of roughly page_size bytes, readable by Pillow
+    width = height = max(int(math.sqrt(page_size)), 1)
+    pixels = bytes((x * 7 + y * 3) % 256 for y in range(height) for x in range(width))
+    entries = [
+        (256, 3, 1, width),  # ImageWidth
+        (257, 3, 1, height),  # ImageLength
+        (258, 3, 1, 8),  # BitsPerSample
+        (259, 3, 1, 1),  # Compression: none
+        (262, 3, 1, 1),  # PhotometricInterpretation: black is zero
+        (273, 4, 1, 0),  # StripOffsets, filled in below
+        (277, 3, 1, 1),  # SamplesPerPixel
+        (278, 3, 1, height),  # RowsPerStrip
+        (279, 4, 1, len(pixels))  # StripByteCounts
+    ]
+    ifd_size = 2 + len(entries) * 12 + 4
+    pixel_offset = 8 + ifd_size
+    ifd = struct.pack("<H", len(entries))
+    for tag, field_type, count, value in entries:
+        if tag == 273:
+            value = pixel_offset
+        if field_type == 3:
+            ifd += struct.pack("<HHIHH", tag, field_type, count, value, 0)
+        else:
+            ifd += struct.pack("<HHII", tag, field_type, count, value)
+    ifd += struct.pack("<I", 0)
+    return b"II*\0" + struct.pack("<I", 8) + ifd + pixels
+
+
+def write_item_scans(item_dir, page_count, page_size):
+    preservation_dir = os.path.join(item_dir, "preservation")
+    os.makedirs(preservation_dir, exist_ok=True)
+    page = make_tiff(page_size)
+    for page_number in range(1, page_count + 1):
+        with open(os.path.join(preservation_dir, f"{page_number:04d}.tif"), "wb") as f:
+            f.write(page)
+
+
+def generate_project(base_dir, collection_id, item_count, pages_per_item=2, page_size=4096, scanned_items=None):
+    # writes a project CSV plus dummy preservation TIFFs for the first scanned_items items
+    os.makedirs(base_dir, exist_ok=True)
+    csv_path = os.path.join(base_dir, f"{collection_id}.csv")
+    write_project_csv(csv_path, collection_id, item_count)
+    output_dir = os.path.join(base_dir, "output")
+    collection_dir = os.path.join(output_dir, collection_id)
+    if scanned_items is None:
+        scanned_items = item_count
+    for i in range(min(scanned_items, item_count)):
+        item_dir = os.path.join(collection_dir, f"{collection_id}_{i + 1:06d}")
+        write_item_scans(item_dir, pages_per_item, page_size)
+    return csv_path, output_dir
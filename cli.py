@@ -1,6 +1,10 @@
 import argparse
+import sys
+
+from PyQt5.QtCore import QCoreApplication
 
 from scripts.batch_generate_derivatives import batch_generate_derivatives
+from scripts.batch_run_pipeline import batch_run_pipeline
 
 
 def main():
@@ -13,6 +17,21 @@ def main():
         action="append_const", const="derivatives",
         help="Batch generate derivatives"
     )
+    action_args.add_argument(
+        "-p", "--pipeline", dest="actions",
+        action="append_const", const="pipeline",
+        help="Run every remaining task for each item in the collection"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int,
+        help="Number of items to generate derivatives for in parallel "
+             "(default: 1 with --derivatives, derivatives_jobs from the config with --pipeline)"
+    )
+
+    pipeline_args = parser.add_argument_group("pipeline")
+    pipeline_args.add_argument("--rename-jobs", type=int, help="Number of rename workers")
+    pipeline_args.add_argument("--copy-jobs", type=int, help="Number of copy workers")
+    pipeline_args.add_argument("--complete-jobs", type=int, help="Number of completeness check workers")
 
     args = parser.parse_args()
     if args.actions:
@@ -20,9 +39,23 @@ def main():
     else:
         parser.error("Please supply an action.")
     collection_id = args.collection_id
+    for jobs in [args.jobs, args.rename_jobs, args.copy_jobs, args.complete_jobs]:
+        if jobs is not None and jobs < 1:
+            parser.error("The number of jobs must be at least 1.")
 
+    # the shared database layer uses QtSql, which needs an application object to load its driver
+    app = QCoreApplication(sys.argv[:1])
     if "derivatives" in actions:
-        batch_generate_derivatives(collection_id)
+        batch_generate_derivatives(collection_id, jobs=args.jobs or 1)
+    if "pipeline" in actions:
+        task_jobs = {
+            "rename": args.rename_jobs,
+            "derivatives": args.jobs,
+            "copy": args.copy_jobs,
+            "complete": args.complete_jobs
+        }
+        task_jobs = dict((task, jobs) for task, jobs in task_jobs.items() if jobs)
+        batch_run_pipeline(collection_id, task_jobs=task_jobs)
 
 
 if __name__ == "__main__":
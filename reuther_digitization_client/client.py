@@ -1,14 +1,25 @@
 #!/usr/bin/env python
 
+import time
+
+# taken before any other import so that startup timing covers module loading
+STARTUP_TIME = time.perf_counter()
+
+import logging
+import os
 import sys
 
-from PyQt5.QtCore import QThreadPool
-from PyQt5.QtWidgets import QApplication, QMainWindow
+from PyQt5.QtCore import QEvent, QObject, QThreadPool, QTimer
+from PyQt5.QtWidgets import QApplication, QMainWindow, QMessageBox
 
 from reuther_digitization_client.config import load_config
-from reuther_digitization_client.database import create_connection
-from reuther_digitization_client.items_window import Items
+from reuther_digitization_client.database import create_connection, get_task_runs, requeue_interrupted_jobs
+from reuther_digitization_client.db_writer import DatabaseWriter
+from reuther_digitization_client.leases import LeaseKeeper, release_stale_leases
+from reuther_digitization_client.metrics import summarize_task_runs, write_prometheus_textfile
+from reuther_digitization_client.process_pool import shutdown_process_pool
 from reuther_digitization_client.projects_window import Projects
+from reuther_digitization_client.session_log import add_session_log_handler
 
 from reuther_digitization_client.ui.application_window import Ui_ApplicationWindow
 
@@ -20,29 +31,110 @@ class DigitizationClient(QMainWindow, Ui_ApplicationWindow):
         self.setupUi(self)
         self.config = load_config()
         self.threadpool = QThreadPool()
+        self.db_writer = DatabaseWriter()
+        self.db_writer.error.connect(self.report_db_error)
+        self.lease_keeper = LeaseKeeper(self.config)
+        # rewrite the Prometheus textfile at most once a minute while tasks finish
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setSingleShot(True)
+        self.metrics_timer.setInterval(60 * 1000)
+        self.metrics_timer.timeout.connect(self.export_metrics)
 
         self.projects = Projects(self)
         self.stackedWidget.addWidget(self.projects)
 
-        self.items = Items(self)
-        self.stackedWidget.addWidget(self.items)
+        # built when the first project is loaded
+        self.items = None
 
     def show_projects(self):
+        self.db_writer.wait_for_flush()
         self.projects.load_projects()
         self.stackedWidget.setCurrentIndex(0)
 
     def load_items(self, project_id, project_dir):
-        self.items.load_items(project_id, project_dir)
-        self.stackedWidget.setCurrentIndex(1)
+        self.get_items_window().load_items(project_id, project_dir)
+        self.stackedWidget.setCurrentWidget(self.items)
+
+    def get_items_window(self):
+        if self.items is None:
+            from reuther_digitization_client.items_window import Items
+            self.items = Items(self)
+            self.stackedWidget.addWidget(self.items)
+        return self.items
+
+    def report_db_error(self, message):
+        QMessageBox.warning(self, "Database error", f"Could not save task results: {message}\n\nThey will be saved again with the next task results.")
+
+    def schedule_metrics_export(self):
+        if self.config.get("metrics_textfile") and not self.metrics_timer.isActive():
+            self.metrics_timer.start()
+
+    def export_metrics(self):
+        self.db_writer.wait_for_flush()
+        try:
+            write_prometheus_textfile(self.config["metrics_textfile"], summarize_task_runs(get_task_runs()))
+        except OSError as e:
+            logging.error(f"Could not write metrics textfile: {str(e)}")
+
+
+class FirstPaintTimer(QObject):
+    # Reports how long startup took once the main window has painted for the
+    # first time. Enabled with --startup-timing or REUTHER_STARTUP_TIMING=1;
+    # with --startup-timing the client quits right after reporting.
+    def __init__(self, quit_after_report, parent=None):
+        super().__init__(parent)
+        self.quit_after_report = quit_after_report
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - STARTUP_TIME))
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            self.mark("first paint")
+            # after the paint event so the report covers the complete first frame
+            QTimer.singleShot(0, self.report)
+        return False
+
+    def report(self):
+        report = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.marks)
+        logging.info(f"startup timing: {report}")
+        print(f"startup timing: {report}", file=sys.stderr)
+        if self.quit_after_report:
+            QApplication.quit()
 
 
 def main():
+    startup_timing = "--startup-timing" in sys.argv
+    if startup_timing:
+        sys.argv.remove("--startup-timing")
     app = QApplication(sys.argv)
+    first_paint_timer = None
+    if startup_timing or os.environ.get("REUTHER_STARTUP_TIMING") == "1":
+        first_paint_timer = FirstPaintTimer(startup_timing)
+        first_paint_timer.mark("imports")
+    config = load_config()
+    add_session_log_handler(config)
     if not create_connection():
         sys.exit(1)
+    # before requeueing, so that jobs on items this station's previous session had leased are requeued too
+    stale_leases = release_stale_leases(config)
+    if stale_leases:
+        logging.warning(f"released {stale_leases} item leases left by a previous session on this station")
+    interrupted_jobs = requeue_interrupted_jobs(config["station_id"])
+    if interrupted_jobs:
+        logging.warning(f"re-queued {interrupted_jobs} tasks interrupted in a previous session; they resume when their project is loaded")
     form = DigitizationClient()
+    if first_paint_timer:
+        first_paint_timer.mark("window constructed")
+        form.installEventFilter(first_paint_timer)
     form.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    form.lease_keeper.shutdown()
+    form.db_writer.shutdown()
+    shutdown_process_pool()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
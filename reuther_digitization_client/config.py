@@ -1,21 +1,92 @@
 import configparser
 import os
+import socket
 
 
-def load_config():
+JOURNAL_MODES = ["WAL", "DELETE", "TRUNCATE", "PERSIST"]
+
+
+def get_db_path():
+    # REUTHER_DIGITIZATION_DB points the client and scripts at another database, e.g. for benchmarks
+    db_path = os.environ.get("REUTHER_DIGITIZATION_DB")
+    if db_path:
+        return db_path
+    # database_path points several stations at one shared database
+    db_path = read_config_file().get("defaults", "database_path", fallback="")
+    if db_path:
+        return db_path
     this_dir = os.path.dirname(os.path.abspath(__file__))
-    config_file = os.path.join(this_dir, "conf", "config.cfg")
+    db_dir = os.path.join(this_dir, "db")
+    if not os.path.exists(db_dir):
+        os.makedirs(db_dir)
+    return os.path.join(db_dir, "digitization_client.sqlite")
+
+
+def get_config_path():
+    # REUTHER_DIGITIZATION_CONFIG points at another configuration file, e.g. for benchmarks
+    config_file = os.environ.get("REUTHER_DIGITIZATION_CONFIG")
+    if config_file:
+        return config_file
+    this_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(this_dir, "conf", "config.cfg")
+
+
+def read_config_file():
     config = configparser.ConfigParser()
-    config.read(config_file)
+    config.read(get_config_path())
+    return config
+
+
+def get_journal_mode():
+    journal_mode = read_config_file().get("defaults", "database_journal_mode", fallback="WAL").upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"Unknown database_journal_mode {journal_mode}. Expected one of {', '.join(JOURNAL_MODES)}")
+    return journal_mode
+
+
+def load_config():
+    config = read_config_file()
     generate_derivatives = config.get("defaults", "generate_derivatives")
     if generate_derivatives.lower() in ["true", "y", "yes"]:
         generate_derivatives = True
     else:
         generate_derivatives = False
     derivative_type = config.get("defaults", "derivative_type")
+    task_jobs = {
+        "rename": config.getint("defaults", "rename_jobs", fallback=2),
+        "derivatives": config.getint("defaults", "derivatives_jobs", fallback=os.cpu_count() or 1),
+        "copy": config.getint("defaults", "copy_jobs", fallback=8),
+        "complete": config.getint("defaults", "complete_jobs", fallback=2)
+    }
+    transfer_verify = config.get("defaults", "transfer_verify", fallback="mtime")
     return {
         "output_dir": config.get("defaults", "output_dir"),
         "scan_storage_location": config.get("defaults", "scan_storage_location"),
         "generate_derivatives": generate_derivatives,
-        "derivative_type": derivative_type
+        "derivative_type": derivative_type,
+        # derivative_type may list several types, e.g. jp2,pdf
+        "derivative_types": [value.strip() for value in derivative_type.split(",") if value.strip()],
+        "pdf_dpi": config.getint("defaults", "pdf_dpi", fallback=150),
+        "pdf_quality": config.getint("defaults", "pdf_quality", fallback=75),
+        "rename_pattern": config.get("defaults", "rename_pattern", fallback=""),
+        "derivative_cache_dir": config.get("defaults", "derivative_cache_dir", fallback=""),
+        "derivative_cache_max_bytes": config.getint("defaults", "derivative_cache_max_bytes", fallback=0),
+        "derivative_mode": config.get("defaults", "derivative_mode", fallback="item"),
+        "task_jobs": task_jobs,
+        "station_id": config.get("defaults", "station_id", fallback="") or socket.gethostname(),
+        "lease_seconds": config.getint("defaults", "lease_seconds", fallback=300),
+        "transfer_jobs": config.getint("defaults", "transfer_jobs", fallback=4),
+        "transfer_verify": transfer_verify,
+        "transfer_bundle": config.getboolean("defaults", "transfer_bundle", fallback=False),
+        "transfer_bundle_max_file_size": config.getint("defaults", "transfer_bundle_max_file_size", fallback=1024 * 1024),
+        "watch_folders": config.getboolean("defaults", "watch_folders", fallback=False),
+        "watch_debounce_seconds": config.getfloat("defaults", "watch_debounce_seconds", fallback=30),
+        "watch_auto_derivatives": config.getboolean("defaults", "watch_auto_derivatives", fallback=False),
+        "worker_processes": config.getint("defaults", "worker_processes", fallback=task_jobs["derivatives"]),
+        "metrics_textfile": config.get("defaults", "metrics_textfile", fallback=""),
+        "log_max_lines": config.getint("defaults", "log_max_lines", fallback=5000),
+        "log_dir": config.get("defaults", "log_dir", fallback=""),
+        "log_max_bytes": config.getint("defaults", "log_max_bytes", fallback=5 * 1024 * 1024),
+        "log_backup_count": config.getint("defaults", "log_backup_count", fallback=5),
+        "log_keep_sessions": config.getint("defaults", "log_keep_sessions", fallback=30)
     }
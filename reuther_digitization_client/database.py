@@ -1,53 +1,109 @@
-import os
+import logging
+import time
 
 from PyQt5.QtSql import QSqlDatabase, QSqlQuery
 
+from reuther_digitization_client.config import get_db_path, get_journal_mode
+from reuther_digitization_client.schema import CONNECTION_PRAGMAS, MIGRATIONS, SCHEMA_VERSION
+from reuther_digitization_client.tasks import TASKS
+
 
 def create_connection():
     connection = QSqlDatabase.addDatabase("QSQLITE")
-    this_dir = os.path.dirname(os.path.abspath(__file__))
-    db_dir = os.path.join(this_dir, "db")
-    if not os.path.exists(db_dir):
-        os.makedirs(db_dir)
-    db_path = os.path.join(db_dir, "digitization_client.sqlite")
-    connection.setDatabaseName(db_path)
-    connection.open()
+    connection.setDatabaseName(get_db_path())
+    if not connection.open():
+        logging.error(f"Could not open database: {connection.lastError().text()}")
+        return False
+    configure_connection(connection, report_errors=True)
+    try:
+        migrate_database(connection)
+    except RuntimeError as e:
+        logging.error(str(e))
+        return False
+    return True
 
-    query = QSqlQuery()
 
-    query.exec_("PRAGMA foreign_keys = ON")
+def ensure_connection():
+    # for code shared between the GUI and the command line scripts
+    if get_connection().isOpen():
+        return True
+    return create_connection()
 
-    projects_table_query = """
-        CREATE TABLE IF NOT EXISTS projects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            collection_id VARCHAR(10),
-            name VARCHAR(40),
-            project_dir VARCHAR(255)
-        )
-        """
 
-    items_table_query = """
-        CREATE TABLE IF NOT EXISTS items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title VARCHAR(500),
-            dates VARCHAR(500),
-            box VARCHAR(20),
-            folder VARCHAR(20),
-            identifier VARCHAR(40),
-            uri VARCHAR(50),
-            rename BOOLEAN DEFAULT 0,
-            derivatives BOOLEAN DEFAULT 0,
-            copy BOOLEAN DEFAULT 0,
-            complete BOOLEAN DEFAULT 0,
-            page_count INT DEFAULT 0,
-            project_id INTEGER NOT NULL,
-            FOREIGN KEY(project_id) REFERENCES projects(id)
-        )
-        """
+def configure_connection(connection, report_errors=False):
+    query = QSqlQuery(connection)
+    for pragma in CONNECTION_PRAGMAS:
+        query.exec_(pragma)
+    try:
+        journal_mode = get_journal_mode()
+    except ValueError as e:
+        # reported once, for the main connection; the connections of worker threads follow it quietly
+        if report_errors:
+            logging.warning(f"{e}; keeping the database's current journal mode")
+        return
+    query.exec_(f"PRAGMA journal_mode = {journal_mode}")
+
+
+def get_schema_version(connection):
+    query = QSqlQuery(connection)
+    query.exec_("PRAGMA user_version")
+    query.first()
+    return query.value(0)
+
+
+def migrate_database(connection):
+    current_version = get_schema_version(connection)
+    query = QSqlQuery(connection)
+    for version in range(current_version + 1, SCHEMA_VERSION + 1):
+        connection.transaction()
+        for statement in MIGRATIONS[version - 1]:
+            if not query.exec_(statement):
+                error = query.lastError().text()
+                connection.rollback()
+                raise RuntimeError(f"Could not upgrade database to version {version}: {error}")
+        query.exec_(f"PRAGMA user_version = {version}")
+        connection.commit()
+
+
+def open_connection(connection_name):
+    # Qt connections can only be used from the thread that opened them
+    connection = QSqlDatabase.addDatabase("QSQLITE", connection_name)
+    connection.setDatabaseName(get_db_path())
+    if not connection.open():
+        raise RuntimeError(f"Could not open database: {connection.lastError().text()}")
+    configure_connection(connection)
+
+
+def close_connection(connection_name):
+    for key in list(prepared_queries):
+        if key[0] == connection_name:
+            del prepared_queries[key]
+    QSqlDatabase.database(connection_name, False).close()
+    QSqlDatabase.removeDatabase(connection_name)
+
+
+def get_connection(connection_name=None):
+    if connection_name:
+        return QSqlDatabase.database(connection_name)
+    return QSqlDatabase.database()
+
+
+# name Qt gives the connection opened without one; PyQt5 does not expose QSqlDatabase.defaultConnection
+DEFAULT_CONNECTION = "qt_sql_default_connection"
+
+# prepared statements by (connection name, SQL), reused by statements that run once per item or task
+prepared_queries = {}
 
-    query.exec_(projects_table_query)
-    query.exec_(items_table_query)
-    return True
+
+def prepare_query(sql, connection_name=None):
+    key = (connection_name or DEFAULT_CONNECTION, sql)
+    query = prepared_queries.get(key)
+    if query is None:
+        query = QSqlQuery(get_connection(connection_name))
+        query.setForwardOnly(True)
+        query.prepare(sql)
+        prepared_queries[key] = query
+    return query
 
 
 def get_projects():
@@ -58,13 +114,13 @@ def get_projects():
             projects.collection_id,
             projects.name,
             projects.project_dir,
-            COUNT(items.id) item_total,
-            SUM(CASE WHEN items.complete=1 THEN 1 ELSE 0 END),
-            SUM(items.page_count)
+            project_summary.total_items,
+            project_summary.completed_items,
+            project_summary.total_scans
         FROM projects
-        LEFT OUTER JOIN items on items.project_id=projects.id
-        GROUP BY projects.id
-        HAVING item_total > 0
+        JOIN project_summary on project_summary.project_id=projects.id
+        WHERE project_summary.total_items > 0
+        ORDER BY projects.id
         """
     query = QSqlQuery(sql_query)
     while query.next():
@@ -96,9 +152,41 @@ def create_project(collection_id, project_name, project_dir):
     return project_id
 
 
-def get_project_items(project_id):
+def count_project_items(project_id):
+    query = QSqlQuery()
+    query.prepare("SELECT COUNT(id) FROM items WHERE project_id=:project_id")
+    query.bindValue(":project_id", project_id)
+    query.exec_()
+    query.first()
+    return query.value(0)
+
+
+def delete_project(project_id):
+    query = QSqlQuery()
+    query.prepare("DELETE FROM files WHERE item_id IN (SELECT id FROM items WHERE project_id=:project_id)")
+    query.bindValue(":project_id", project_id)
+    query.exec_()
+    query.prepare("DELETE FROM jobs WHERE item_id IN (SELECT id FROM items WHERE project_id=:project_id)")
+    query.bindValue(":project_id", project_id)
+    query.exec_()
+    query.prepare("DELETE FROM rename_journal WHERE item_id IN (SELECT id FROM items WHERE project_id=:project_id)")
+    query.bindValue(":project_id", project_id)
+    query.exec_()
+    query.prepare("DELETE FROM task_runs WHERE project_id=:project_id")
+    query.bindValue(":project_id", project_id)
+    query.exec_()
+    query.prepare("DELETE FROM items WHERE project_id=:project_id")
+    query.bindValue(":project_id", project_id)
+    query.exec_()
+    query.prepare("DELETE FROM projects WHERE id=:project_id")
+    query.bindValue(":project_id", project_id)
+    query.exec_()
+
+
+def get_project_items(project_id, limit=-1, after_id=0):
     items = []
     query = QSqlQuery()
+    query.setForwardOnly(True)
     query.prepare("""
     SELECT
         title,
@@ -112,9 +200,13 @@ def get_project_items(project_id):
         complete,
         id
     FROM items
-    WHERE project_id=:project_id
+    WHERE project_id=:project_id AND id > :after_id
+    ORDER BY id
+    LIMIT :limit
     """)
     query.bindValue(":project_id", project_id)
+    query.bindValue(":after_id", after_id)
+    query.bindValue(":limit", limit)
     query.exec_()
     while query.next():
         item = {}
@@ -139,6 +231,36 @@ def get_project_items(project_id):
     return items
 
 
+def get_project_by_collection_id(collection_id):
+    query = QSqlQuery()
+    query.prepare("SELECT id, project_dir FROM projects WHERE collection_id=:collection_id ORDER BY id LIMIT 1")
+    query.bindValue(":collection_id", collection_id)
+    query.exec_()
+    if query.first():
+        return {"id": query.value(0), "project_dir": query.value(1)}
+    return None
+
+
+def get_items_needing_task(project_id, tasks, task):
+    # items whose earlier tasks are all done but which still need this one
+    conditions = ["%s=1" % previous_task for previous_task in tasks[:tasks.index(task)]]
+    conditions.append("%s=0" % task)
+    items = []
+    query = QSqlQuery()
+    query.setForwardOnly(True)
+    query.prepare("""
+    SELECT id, identifier
+    FROM items
+    WHERE project_id=:project_id AND %s
+    ORDER BY id
+    """ % " AND ".join(conditions))
+    query.bindValue(":project_id", project_id)
+    query.exec_()
+    while query.next():
+        items.append({"id": query.value(0), "identifier": query.value(1)})
+    return items
+
+
 def create_item(item, project_id):
     identifier = item["item_identifier"]
     title = item["title"]
@@ -163,9 +285,40 @@ def create_item(item, project_id):
     query.exec_()
 
 
-def get_item_progress(item_id):
-    query = QSqlQuery()
-    query.prepare("SELECT rename, derivatives, copy, complete FROM items WHERE id=:item_id")
+def create_items(items, project_id, connection_name=None, batch_size=500, progress_callback=None, is_cancelled=None):
+    connection = get_connection(connection_name)
+    connection.transaction()
+    query = QSqlQuery(connection)
+    query.prepare("""
+    INSERT INTO items
+        (title, dates, box, folder, identifier, uri, project_id)
+    VALUES
+        (?, ?, ?, ?, ?, ?, ?)
+    """)
+    for start in range(0, len(items), batch_size):
+        if is_cancelled and is_cancelled():
+            connection.rollback()
+            return False
+        batch = items[start:start + batch_size]
+        query.addBindValue([item["title"] for item in batch])
+        query.addBindValue([item["dates"] for item in batch])
+        query.addBindValue([item["box"] for item in batch])
+        query.addBindValue([item["folder"] for item in batch])
+        query.addBindValue([item["item_identifier"] for item in batch])
+        query.addBindValue([item["uri"] for item in batch])
+        query.addBindValue([project_id] * len(batch))
+        if not query.execBatch():
+            error = query.lastError().text()
+            connection.rollback()
+            raise RuntimeError(f"Could not import items: {error}")
+        if progress_callback:
+            progress_callback(start + len(batch), len(items))
+    connection.commit()
+    return True
+
+
+def get_item_progress(item_id, connection_name=None):
+    query = prepare_query("SELECT rename, derivatives, copy, complete FROM items WHERE id=:item_id", connection_name)
     query.bindValue(":item_id", item_id)
     query.exec_()
     query.first()
@@ -175,26 +328,378 @@ def get_item_progress(item_id):
         "copy": query.value(2),
         "complete": query.value(3)
     }
+    query.finish()
     return progress
 
 
-def reset_task_progress(item_id):
+def get_item_files(item_id):
+    files = {}
+    query = prepare_query("SELECT path, size, mtime, checksum FROM files WHERE item_id=:item_id")
+    query.bindValue(":item_id", item_id)
+    query.exec_()
+    while query.next():
+        files[query.value(0)] = {
+            "size": query.value(1),
+            "mtime": query.value(2),
+            "checksum": query.value(3)
+        }
+    query.finish()
+    return files
+
+
+def get_project_files(project_id):
+    # the files of every item in a project, by item id, in one statement
+    project_files = {}
     query = QSqlQuery()
-    query.prepare("UPDATE items SET rename=0, derivatives=0, copy=0, complete=0 WHERE id=:item_id")
+    query.setForwardOnly(True)
+    query.prepare("""
+    SELECT files.item_id, files.path, files.size, files.mtime, files.checksum
+    FROM files
+    JOIN items ON items.id = files.item_id
+    WHERE items.project_id=:project_id
+    """)
+    query.bindValue(":project_id", project_id)
+    query.exec_()
+    while query.next():
+        project_files.setdefault(query.value(0), {})[query.value(1)] = {
+            "size": query.value(2),
+            "mtime": query.value(3),
+            "checksum": query.value(4)
+        }
+    return project_files
+
+
+def write_item_files(item_id, files, connection_name=None):
+    query = prepare_query("DELETE FROM files WHERE item_id=:item_id", connection_name)
     query.bindValue(":item_id", item_id)
     query.exec_()
+    query = prepare_query("INSERT INTO files (item_id, path, size, mtime, checksum) VALUES (?, ?, ?, ?, ?)", connection_name)
+    paths = sorted(files)
+    query.bindValue(0, [item_id] * len(paths))
+    query.bindValue(1, paths)
+    query.bindValue(2, [files[path]["size"] for path in paths])
+    query.bindValue(3, [files[path]["mtime"] for path in paths])
+    query.bindValue(4, [files[path]["checksum"] for path in paths])
+    if paths and not query.execBatch():
+        raise RuntimeError(f"Could not record files for item {item_id}: {query.lastError().text()}")
+
 
+def write_item_updates(item_updates, task_runs, connection_name=None):
+    # item_updates maps item ids to {"progress": {task: 0 or 1}, "page_count": int, "files": {...}},
+    # each key optional; everything is written in a single transaction
+    connection = get_connection(connection_name)
+    connection.transaction()
+    try:
+        for item_id, update in item_updates.items():
+            columns = dict((task, value) for task, value in update.get("progress", {}).items() if task in TASKS)
+            if "page_count" in update:
+                columns["page_count"] = update["page_count"]
+            if columns:
+                assignments = ", ".join(f"{column}=:{column}" for column in columns)
+                query = prepare_query(f"UPDATE items SET {assignments} WHERE id=:item_id", connection_name)
+                for column, value in columns.items():
+                    query.bindValue(f":{column}", value)
+                query.bindValue(":item_id", item_id)
+                if not query.exec_():
+                    raise RuntimeError(f"Could not update item {item_id}: {query.lastError().text()}")
+            if "files" in update:
+                write_item_files(item_id, update["files"], connection_name=connection_name)
+        for item_id, project_id, task_run in task_runs:
+            create_task_run(item_id, project_id, task_run, connection_name=connection_name)
+    except RuntimeError:
+        connection.rollback()
+        raise
+    if not connection.commit():
+        error = connection.lastError().text()
+        connection.rollback()
+        raise RuntimeError(f"Could not save item updates: {error}")
 
-def update_item_progress(item_id, task):
+
+def get_item_id(project_dir, identifier, connection_name=None):
+    query = prepare_query("""
+    SELECT items.id
+    FROM items
+    JOIN projects ON projects.id = items.project_id
+    WHERE projects.project_dir=:project_dir AND items.identifier=:identifier
+    """, connection_name)
+    query.bindValue(":project_dir", project_dir)
+    query.bindValue(":identifier", identifier)
+    query.exec_()
+    item_id = query.value(0) if query.first() else None
+    query.finish()
+    return item_id
+
+
+def get_rename_journal(item_id, connection_name=None):
+    entries = []
+    query = prepare_query("""
+    SELECT old_name, temp_name, new_name, state
+    FROM rename_journal
+    WHERE item_id=:item_id
+    ORDER BY id
+    """, connection_name)
+    query.bindValue(":item_id", item_id)
+    query.exec_()
+    while query.next():
+        entries.append({
+            "old_name": query.value(0),
+            "temp_name": query.value(1),
+            "new_name": query.value(2),
+            "state": query.value(3)
+        })
+    query.finish()
+    return entries
+
+
+def create_rename_journal(item_id, entries, connection_name=None):
+    connection = get_connection(connection_name)
+    connection.transaction()
+    query = QSqlQuery(connection)
+    query.prepare("INSERT INTO rename_journal (item_id, old_name, temp_name, new_name) VALUES (?, ?, ?, ?)")
+    query.addBindValue([item_id] * len(entries))
+    query.addBindValue([entry["old_name"] for entry in entries])
+    query.addBindValue([entry["temp_name"] for entry in entries])
+    query.addBindValue([entry["new_name"] for entry in entries])
+    if entries and not query.execBatch():
+        error = query.lastError().text()
+        connection.rollback()
+        raise RuntimeError(f"Could not record the rename plan for item {item_id}: {error}")
+    connection.commit()
+
+
+def set_rename_journal_state(item_id, state, connection_name=None):
+    query = prepare_query("UPDATE rename_journal SET state=:state WHERE item_id=:item_id", connection_name)
+    query.bindValue(":state", state)
+    query.bindValue(":item_id", item_id)
+    query.exec_()
+
+
+def delete_rename_journal(item_id, connection_name=None):
+    query = prepare_query("DELETE FROM rename_journal WHERE item_id=:item_id", connection_name)
+    query.bindValue(":item_id", item_id)
+    query.exec_()
+
+
+def create_job(item_id, task, owner):
+    query = prepare_query("INSERT INTO jobs (item_id, task, owner) VALUES (:item_id, :task, :owner)")
+    query.bindValue(":item_id", item_id)
+    query.bindValue(":task", task)
+    query.bindValue(":owner", owner)
+    query.exec_()
+    return query.lastInsertId()
+
+
+def claim_job(job_id, connection_name=None):
+    query = prepare_query("""
+    UPDATE jobs
+    SET state='running', attempts=attempts + 1, started_at=CURRENT_TIMESTAMP
+    WHERE id=:job_id AND state='queued'
+    """, connection_name)
+    query.bindValue(":job_id", job_id)
+    query.exec_()
+    return query.numRowsAffected() == 1
+
+
+def finish_job(job_id, error=None, connection_name=None):
+    query = prepare_query("""
+    UPDATE jobs
+    SET state=:state, finished_at=CURRENT_TIMESTAMP, last_error=:error
+    WHERE id=:job_id
+    """, connection_name)
+    query.bindValue(":state", "failed" if error else "done")
+    query.bindValue(":error", error)
+    query.bindValue(":job_id", job_id)
+    query.exec_()
+
+
+def cancel_jobs(job_ids):
+    if not job_ids:
+        return
+    query = QSqlQuery()
+    query.prepare("UPDATE jobs SET state='cancelled', finished_at=CURRENT_TIMESTAMP WHERE id=? AND state='queued'")
+    query.addBindValue(list(job_ids))
+    query.execBatch()
+
+
+def requeue_interrupted_jobs(owner):
+    # jobs of other stations are theirs to requeue, and jobs still running in another
+    # process of this station hold a lease on their item, so both are left alone
     query = QSqlQuery()
-    query.prepare("UPDATE items SET %s=1 WHERE id=:item_id" % task)
+    query.prepare("""
+    UPDATE jobs SET state='queued'
+    WHERE state='running' AND (owner=:owner OR owner IS NULL)
+    AND item_id NOT IN (SELECT id FROM items WHERE lease_expires > :now)
+    """)
+    query.bindValue(":owner", owner)
+    query.bindValue(":now", time.time())
+    query.exec_()
+    return query.numRowsAffected()
+
+
+def claim_item_lease(item_id, owner, lease_seconds, connection_name=None):
+    # a single UPDATE, so two stations can never both take a free or expired lease
+    now = time.time()
+    query = prepare_query("""
+    UPDATE items
+    SET lease_owner=:owner, lease_expires=:expires
+    WHERE id=:item_id AND (lease_owner IS NULL OR lease_owner=:owner OR lease_expires < :now)
+    """, connection_name)
+    query.bindValue(":owner", owner)
+    query.bindValue(":expires", now + lease_seconds)
+    query.bindValue(":item_id", item_id)
+    query.bindValue(":now", now)
+    query.exec_()
+    return query.numRowsAffected() == 1
+
+
+def renew_item_leases(item_ids, owner, lease_seconds, connection_name=None):
+    # returns the items whose lease has expired and been taken by another station
+    lost_item_ids = []
+    query = prepare_query(
+        "UPDATE items SET lease_expires=:expires WHERE id=:item_id AND lease_owner=:owner",
+        connection_name
+    )
+    for item_id in item_ids:
+        query.bindValue(":expires", time.time() + lease_seconds)
+        query.bindValue(":item_id", item_id)
+        query.bindValue(":owner", owner)
+        query.exec_()
+        if query.numRowsAffected() != 1:
+            lost_item_ids.append(item_id)
+    return lost_item_ids
+
+
+def release_item_lease(item_id, owner, connection_name=None):
+    query = prepare_query(
+        "UPDATE items SET lease_owner=NULL, lease_expires=NULL WHERE id=:item_id AND lease_owner=:owner",
+        connection_name
+    )
+    query.bindValue(":item_id", item_id)
+    query.bindValue(":owner", owner)
+    query.exec_()
+
+
+def get_lease_owners(owner_prefix):
+    owners = []
+    query = QSqlQuery()
+    query.setForwardOnly(True)
+    query.prepare("SELECT DISTINCT lease_owner FROM items WHERE substr(lease_owner, 1, length(:prefix))=:prefix")
+    query.bindValue(":prefix", owner_prefix)
+    query.exec_()
+    while query.next():
+        owners.append(query.value(0))
+    return owners
+
+
+def release_owner_leases(owner):
+    query = QSqlQuery()
+    query.prepare("UPDATE items SET lease_owner=NULL, lease_expires=NULL WHERE lease_owner=:owner")
+    query.bindValue(":owner", owner)
+    query.exec_()
+    return query.numRowsAffected()
+
+
+def get_item_lease_owner(item_id, connection_name=None):
+    query = prepare_query("SELECT lease_owner FROM items WHERE id=:item_id AND lease_expires > :now", connection_name)
     query.bindValue(":item_id", item_id)
+    query.bindValue(":now", time.time())
     query.exec_()
+    owner = query.value(0) if query.first() else None
+    query.finish()
+    return owner
 
 
-def update_item_page_count(item_id, page_count):
+def get_queued_jobs(project_id, owner):
+    jobs = []
     query = QSqlQuery()
-    query.prepare("UPDATE items SET page_count=:page_count WHERE id=:item_id")
-    query.bindValue(":page_count", page_count)
+    query.setForwardOnly(True)
+    query.prepare("""
+    SELECT
+        jobs.id,
+        jobs.item_id,
+        jobs.task,
+        items.identifier,
+        items.rename,
+        items.derivatives,
+        items.copy,
+        items.complete
+    FROM jobs
+    JOIN items ON items.id=jobs.item_id
+    WHERE jobs.state='queued' AND items.project_id=:project_id AND (jobs.owner=:owner OR jobs.owner IS NULL)
+    ORDER BY jobs.id
+    """)
+    query.bindValue(":project_id", project_id)
+    query.bindValue(":owner", owner)
+    query.exec_()
+    while query.next():
+        job = {
+            "id": query.value(0),
+            "item_id": query.value(1),
+            "task": query.value(2),
+            "identifier": query.value(3),
+            "progress": {
+                "rename": query.value(4),
+                "derivatives": query.value(5),
+                "copy": query.value(6),
+                "complete": query.value(7)
+            }
+        }
+        jobs.append(job)
+    return jobs
+
+
+def create_task_run(item_id, project_id, task_run, connection_name=None):
+    query = prepare_query("""
+    INSERT INTO task_runs
+        (item_id, project_id, task, started_at, finished_at, duration, page_count, bytes_processed, outcome, error)
+    VALUES
+        (:item_id, :project_id, :task, :started_at, :finished_at, :duration, :page_count, :bytes_processed, :outcome, :error)
+    """, connection_name)
     query.bindValue(":item_id", item_id)
+    query.bindValue(":project_id", project_id)
+    for key in ["task", "started_at", "finished_at", "duration", "page_count", "bytes_processed", "outcome", "error"]:
+        query.bindValue(f":{key}", task_run.get(key))
+    if not query.exec_():
+        raise RuntimeError(f"Could not record the {task_run.get('task')} run for item {item_id}: {query.lastError().text()}")
+
+
+def get_task_runs(project_id=None):
+    task_runs = []
+    query = QSqlQuery()
+    query.setForwardOnly(True)
+    query.prepare("""
+    SELECT
+        projects.collection_id,
+        items.identifier,
+        task_runs.task,
+        task_runs.started_at,
+        task_runs.finished_at,
+        task_runs.duration,
+        task_runs.page_count,
+        task_runs.bytes_processed,
+        task_runs.outcome,
+        task_runs.error
+    FROM task_runs
+    JOIN projects ON projects.id=task_runs.project_id
+    JOIN items ON items.id=task_runs.item_id
+    WHERE :all_projects OR task_runs.project_id=:project_id
+    ORDER BY task_runs.id
+    """)
+    query.bindValue(":all_projects", 1 if project_id is None else 0)
+    query.bindValue(":project_id", project_id)
     query.exec_()
+    while query.next():
+        task_run = {
+            "collection_id": query.value(0),
+            "identifier": query.value(1),
+            "task": query.value(2),
+            "started_at": query.value(3),
+            "finished_at": query.value(4),
+            "duration": query.value(5),
+            "page_count": query.value(6),
+            "bytes_processed": query.value(7),
+            "outcome": query.value(8),
+            "error": query.value(9)
+        }
+        task_runs.append(task_run)
+    return task_runs
@@ -0,0 +1,124 @@
+import logging
+import threading
+
+from PyQt5.QtCore import QMetaObject, QObject, QThread, QTimer, Qt, pyqtSignal, pyqtSlot
+
+from reuther_digitization_client.database import close_connection, get_item_files, open_connection, write_item_updates
+
+
+class DatabaseWriter(QObject):
+    # Write-behind queue for the updates that follow a finished task. The GUI
+    # thread records updates in memory and a thread of its own writes them,
+    # coalesced per item, in one transaction at most flush_interval ms after
+    # the first of them arrived, so a burst of finishing workers costs one
+    # commit instead of a few autocommits each.
+    queued = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, flush_interval=100):
+        super().__init__()
+        self.flush_interval = flush_interval
+        self.connection_name = "db-writer"
+        self.lock = threading.Lock()
+        # updates waiting to be written, and the batch currently being written
+        self.pending = {}
+        self.pending_task_runs = []
+        self.flushing = {}
+        self.timer = None
+        self.thread = QThread()
+        self.moveToThread(self.thread)
+        self.thread.started.connect(self.start)
+        self.queued.connect(self.schedule_flush)
+        self.thread.start()
+
+    @pyqtSlot()
+    def start(self):
+        open_connection(self.connection_name)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.flush_interval)
+        self.timer.timeout.connect(self.flush)
+        # pick up anything queued before the thread was running
+        self.schedule_flush()
+
+    def get_update(self, item_id):
+        return self.pending.setdefault(item_id, {})
+
+    def set_progress(self, item_id, progress):
+        with self.lock:
+            self.get_update(item_id).setdefault("progress", {}).update(progress)
+        self.queued.emit()
+
+    def set_page_count(self, item_id, page_count):
+        with self.lock:
+            self.get_update(item_id)["page_count"] = page_count
+        self.queued.emit()
+
+    def set_files(self, item_id, files):
+        with self.lock:
+            self.get_update(item_id)["files"] = files
+        self.queued.emit()
+
+    def add_task_run(self, item_id, project_id, task_run):
+        with self.lock:
+            self.pending_task_runs.append((item_id, project_id, task_run))
+        self.queued.emit()
+
+    def get_item_files(self, item_id):
+        # files that have not been written yet take precedence over the database
+        with self.lock:
+            for updates in [self.pending, self.flushing]:
+                if "files" in updates.get(item_id, {}):
+                    return updates[item_id]["files"]
+        return get_item_files(item_id)
+
+    @pyqtSlot()
+    def schedule_flush(self):
+        if self.timer is not None and not self.timer.isActive():
+            self.timer.start()
+
+    @pyqtSlot()
+    def flush(self):
+        with self.lock:
+            self.flushing = self.pending
+            task_runs = self.pending_task_runs
+            self.pending = {}
+            self.pending_task_runs = []
+        if self.flushing or task_runs:
+            try:
+                write_item_updates(self.flushing, task_runs, connection_name=self.connection_name)
+            except RuntimeError as e:
+                logging.error(str(e))
+                self.requeue(self.flushing, task_runs)
+                self.error.emit(str(e))
+        with self.lock:
+            self.flushing = {}
+
+    def requeue(self, updates, task_runs):
+        # a batch that could not be written goes out again with the next flush,
+        # under any updates to the same items queued since it was taken
+        with self.lock:
+            for item_id, update in updates.items():
+                newer = self.pending.get(item_id, {})
+                progress = dict(update.get("progress", {}), **newer.get("progress", {}))
+                update.update(newer)
+                if progress:
+                    update["progress"] = progress
+                self.pending[item_id] = update
+            self.pending_task_runs = task_runs + self.pending_task_runs
+
+    @pyqtSlot()
+    def stop(self):
+        if self.timer is not None:
+            self.timer.stop()
+        self.flush()
+        close_connection(self.connection_name)
+
+    def wait_for_flush(self):
+        # called from the GUI thread before it reads rows that may have pending updates
+        QMetaObject.invokeMethod(self, "flush", Qt.BlockingQueuedConnection)
+
+    def shutdown(self):
+        QMetaObject.invokeMethod(self, "stop", Qt.BlockingQueuedConnection)
+        self.thread.quit()
+        self.thread.wait()
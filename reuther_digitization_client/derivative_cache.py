@@ -0,0 +1,94 @@
+import hashlib
+import os
+import shutil
+
+
+# bump to invalidate every cached derivative when the conversion code changes
+CACHE_VERSION = 1
+
+
+def copy_file(source_path, dest_path):
+    # copies rather than hard links so that touching a cache entry never changes a derivative
+    temp_path = f"{dest_path}.{os.getpid()}.part"
+    shutil.copyfile(source_path, temp_path)
+    os.replace(temp_path, dest_path)
+
+
+def store_in_cache(output_path, cache_path):
+    # module-level so that pool workers can fill the cache as they convert pages
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    copy_file(output_path, cache_path)
+
+
+class DerivativeCache:
+    # Derivatives stored under a key made from the source file's checksum and
+    # the settings they were made with, so unchanged pages are copied from the
+    # cache instead of being converted again. Entries are touched when used
+    # and the least recently used ones are removed once the cache grows past
+    # max_bytes.
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, checksum, settings):
+        return hashlib.sha256(f"{CACHE_VERSION}:{checksum}:{settings}".encode()).hexdigest()
+
+    def get_path(self, key, extension):
+        return os.path.join(self.cache_dir, key[:2], key + extension)
+
+    def fetch(self, key, extension, output_path):
+        cache_path = self.get_path(key, extension)
+        try:
+            os.utime(cache_path)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            copy_file(cache_path, output_path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def store(self, output_path, key, extension):
+        store_in_cache(output_path, self.get_path(key, extension))
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        for dirpath, dirnames, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith(".part"):
+                    continue
+                filepath = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(filepath)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, filepath))
+                total_size += stat.st_size
+        evicted = 0
+        for mtime, size, filepath in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            evicted += 1
+        return evicted
+
+    def __str__(self):
+        return f"derivative cache: {self.hits} hits, {self.misses} misses"
+
+
+def get_derivative_cache(config):
+    max_bytes = config.get("derivative_cache_max_bytes", 0)
+    if max_bytes <= 0:
+        return None
+    cache_dir = config.get("derivative_cache_dir")
+    if not cache_dir:
+        this_dir = os.path.dirname(os.path.abspath(__file__))
+        cache_dir = os.path.join(this_dir, "cache", "derivatives")
+    return DerivativeCache(cache_dir, max_bytes)
@@ -0,0 +1,86 @@
+from concurrent.futures.process import BrokenProcessPool
+import os
+
+from reuther_digitization_client.derivative_cache import store_in_cache
+
+
+# built by reuther_digitization_client.pdf rather than converted page by page
+PDF_TYPE = "pdf"
+
+# Pillow format name, file extension and save options for each derivative_type
+DERIVATIVE_FORMATS = {
+    "jp2": ("JPEG2000", ".jp2", {"irreversible": True, "quality_mode": "rates", "quality_layers": [20]}),
+    "jpg": ("JPEG", ".jpg", {"quality": 90}),
+    "png": ("PNG", ".png", {})
+}
+
+
+def get_derivative_format(derivative_type):
+    try:
+        return DERIVATIVE_FORMATS[derivative_type]
+    except KeyError:
+        raise ValueError(f"Unsupported derivative_type {derivative_type}; choose one of {', '.join(DERIVATIVE_FORMATS)}")
+
+
+def get_derivative_path(output_dir, source_path, derivative_type):
+    extension = get_derivative_format(derivative_type)[1]
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(source_path))[0] + extension)
+
+
+def get_derivative_settings(derivative_type):
+    # part of the cache key, so that changing the output settings invalidates cached derivatives
+    image_format, extension, save_options = get_derivative_format(derivative_type)
+    return f"{derivative_type}:{image_format}:{sorted(save_options.items())}"
+
+
+def convert_page(source_path, output_path, derivative_type, cache_path=None):
+    # module-level so that it can be sent to a process pool; Pillow is only
+    # needed when derivatives are generated page by page
+    from PIL import Image
+    image_format, extension, save_options = get_derivative_format(derivative_type)
+    temp_path = f"{output_path}.part"
+    with Image.open(source_path) as image:
+        if image.mode not in ["RGB", "L"]:
+            image = image.convert("RGB")
+        image.save(temp_path, format=image_format, **save_options)
+    os.replace(temp_path, output_path)
+    if cache_path:
+        store_in_cache(output_path, cache_path)
+    return output_path
+
+
+def generate_page_derivatives(source_paths, output_dir, derivative_type, executor=None, cache=None, checksums=None):
+    # converts every page, in parallel when given an executor, and returns the
+    # derivative paths in page order. With a cache and the pages' checksums,
+    # pages converted before with the same settings are copied from the cache.
+    extension = get_derivative_format(derivative_type)[1]
+    os.makedirs(output_dir, exist_ok=True)
+    output_paths = [get_derivative_path(output_dir, source_path, derivative_type) for source_path in source_paths]
+    conversions = []
+    for index, (source_path, output_path) in enumerate(zip(source_paths, output_paths)):
+        cache_path = None
+        if cache is not None and checksums is not None:
+            key = cache.get_key(checksums[index], get_derivative_settings(derivative_type))
+            if cache.fetch(key, extension, output_path):
+                continue
+            cache_path = cache.get_path(key, extension)
+        conversions.append((source_path, output_path, cache_path))
+    if executor is None:
+        for source_path, output_path, cache_path in conversions:
+            convert_page(source_path, output_path, derivative_type, cache_path)
+        return output_paths
+    futures = [
+        executor.submit(convert_page, source_path, output_path, derivative_type, cache_path)
+        for source_path, output_path, cache_path in conversions
+    ]
+    errors = []
+    for (source_path, output_path, cache_path), future in zip(conversions, futures):
+        try:
+            future.result()
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            errors.append(f"{os.path.basename(source_path)}: {str(e)}")
+    if errors:
+        raise RuntimeError(f"Could not generate {len(errors)} of {len(source_paths)} derivatives: {'; '.join(errors)}")
+    return output_paths
@@ -0,0 +1,69 @@
+from collections import deque
+from functools import partial
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from reuther_digitization_client.database import cancel_jobs, create_job
+
+
+class TaskDispatcher(QObject):
+    # Queues tasks and runs them on threadpool as the TaskWorkers returned by
+    # make_worker, keeping at most task_jobs[task] workers of each task type
+    # running at once. Every task is recorded in the jobs table under owner
+    # so that this station can pick it up again after a restart.
+    progress = pyqtSignal(int, int)
+    item_finished = pyqtSignal(int, str)
+
+    def __init__(self, make_worker, task_jobs, threadpool, owner, parent=None):
+        super().__init__(parent)
+        self.make_worker = make_worker
+        self.owner = owner
+        self.threadpool = threadpool
+        self.task_jobs = task_jobs
+        self.queues = dict((task, deque()) for task in task_jobs)
+        self.running = dict((task, 0) for task in task_jobs)
+        self.total = 0
+        self.finished = 0
+
+    def submit(self, item_id, identifier, task, job_id=None):
+        if job_id is None:
+            job_id = create_job(item_id, task, self.owner)
+        self.queues[task].append((item_id, identifier, job_id))
+        self.total += 1
+        self.progress.emit(self.finished, self.total)
+        self.start_queued(task)
+
+    def start_queued(self, task):
+        while self.queues[task] and self.running[task] < self.task_jobs[task]:
+            item_id, identifier, job_id = self.queues[task].popleft()
+            self.running[task] += 1
+            worker = self.make_worker(item_id, identifier, task, job_id)
+            # connected before the worker starts so that a worker that finishes at once is still counted
+            worker.signals.finished.connect(partial(self.on_worker_finished, item_id, identifier, task))
+            self.threadpool.start(worker)
+
+    def on_worker_finished(self, item_id, identifier, task):
+        self.running[task] -= 1
+        self.finished += 1
+        self.progress.emit(self.finished, self.total)
+        if self.is_idle():
+            self.total = 0
+            self.finished = 0
+        self.item_finished.emit(item_id, identifier)
+        self.start_queued(task)
+
+    def cancel_queued(self):
+        cancelled = []
+        for queue in self.queues.values():
+            while queue:
+                cancelled.append(queue.popleft())
+        cancel_jobs([job_id for item_id, identifier, job_id in cancelled])
+        self.total -= len(cancelled)
+        self.progress.emit(self.finished, self.total)
+        if self.is_idle():
+            self.total = 0
+            self.finished = 0
+        return cancelled
+
+    def is_idle(self):
+        return not any(self.running.values()) and not any(self.queues.values())
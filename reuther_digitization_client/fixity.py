@@ -0,0 +1,48 @@
+import hashlib
+import os
+
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def file_checksum(filepath):
+    checksum = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def build_manifest(base_dir, filepaths):
+    manifest = {}
+    for filepath in filepaths:
+        stat = os.stat(filepath)
+        relative_path = os.path.relpath(filepath, base_dir)
+        manifest[relative_path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "checksum": file_checksum(filepath)
+        }
+    return manifest
+
+
+def matches_manifest_entry(filepath, entry):
+    # cheap check that a file has not changed since its manifest entry was made
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return False
+    return stat.st_size == entry["size"] and abs(stat.st_mtime - entry["mtime"]) < 2
+
+
+def verify_manifest(base_dir, manifest):
+    errors = []
+    for relative_path, entry in sorted(manifest.items()):
+        filepath = os.path.join(base_dir, relative_path)
+        if not os.path.exists(filepath):
+            errors.append(f"{relative_path} is missing")
+        elif os.path.getsize(filepath) != entry["size"]:
+            errors.append(f"{relative_path} is {os.path.getsize(filepath)} bytes, expected {entry['size']}")
+        elif file_checksum(filepath) != entry["checksum"]:
+            errors.append(f"{relative_path} does not match its checksum")
+    return errors
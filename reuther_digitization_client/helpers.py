@@ -1,22 +1,50 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import logging
+import time
 
-from PyQt5.QtCore import QObject, QRunnable, pyqtSignal, pyqtSlot
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QRunnable, QTimer, pyqtSignal, pyqtSlot
 from PyQt5.QtWidgets import QPlainTextEdit
 
+from reuther_digitization_client.database import (
+    claim_item_lease,
+    claim_job,
+    close_connection,
+    create_items,
+    finish_job,
+    get_item_lease_owner,
+    get_item_progress,
+    open_connection,
+    release_item_lease
+)
+from reuther_digitization_client.process_pool import discard_broken_process_pool, get_process_pool
+from reuther_digitization_client.tasks import PROCESS_TASKS, get_task_settings, run_task
+
 
 class WorkerSignals(QObject):
     finished = pyqtSignal()
     status = pyqtSignal(str)
     success = pyqtSignal(str)
     error = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+    item_progress = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    task_run = pyqtSignal(object)
 
 
 class TaskWorker(QRunnable):
 
-    def __init__(self, item, task):
+    def __init__(self, item, task, job_id=None, item_id=None, lease_keeper=None):
         super().__init__()
         self.item = item
         self.task = task
+        self.job_id = job_id
+        self.item_id = item_id
+        # claims the item for this station while the task runs, when given with a job
+        self.lease_keeper = lease_keeper
+        self.lease_held = False
         task_settings = self.get_task_settings()
         self.function = task_settings["function"]
         self.message = task_settings["message"]
@@ -24,33 +52,173 @@ class TaskWorker(QRunnable):
 
     @pyqtSlot()
     def run(self):
-        self.signals.status.emit(f"{self.message} for {self.item.item_identifier}")
-        task_function = self.function
+        connection_name = f"job-{self.job_id}"
         try:
-            response = task_function()
-            self.signals.success.emit(f"successfully finished {self.message} for {self.item.item_identifier}: {response}")
+            if self.job_id:
+                open_connection(connection_name)
+                if not claim_job(self.job_id, connection_name=connection_name):
+                    self.signals.status.emit(f"skipping {self.message} for {self.item.item_identifier}: job {self.job_id} is no longer queued")
+                    return
+                if self.lease_keeper and not self.claim_lease(connection_name):
+                    return
+            self.signals.status.emit(f"{self.message} for {self.item.item_identifier}")
+            task_function = self.function
+            started_at = time.time()
+            try:
+                if self.use_process_pool():
+                    response = self.run_in_process_pool()
+                else:
+                    response = task_function()
+            except Exception as e:
+                self.emit_task_run(started_at, "failed", str(e))
+                if self.job_id:
+                    finish_job(self.job_id, error=str(e), connection_name=connection_name)
+                self.signals.error.emit(str(e))
+            else:
+                self.emit_task_run(started_at, "success")
+                if self.job_id:
+                    finish_job(self.job_id, connection_name=connection_name)
+                self.signals.success.emit(f"successfully finished {self.message} for {self.item.item_identifier}: {response}")
         except Exception as e:
             self.signals.error.emit(str(e))
         finally:
+            if self.lease_held:
+                self.lease_keeper.remove(self.item_id)
+                release_item_lease(self.item_id, self.lease_keeper.owner, connection_name=connection_name)
+            if self.job_id:
+                close_connection(connection_name)
             self.signals.finished.emit()
 
+    def claim_lease(self, connection_name):
+        owner = self.lease_keeper.owner
+        if not claim_item_lease(self.item_id, owner, self.lease_keeper.lease_seconds, connection_name=connection_name):
+            lease_owner = get_item_lease_owner(self.item_id, connection_name=connection_name) or "another station"
+            finish_job(self.job_id, error=f"leased by {lease_owner}", connection_name=connection_name)
+            self.signals.status.emit(f"skipping {self.message} for {self.item.item_identifier}: {lease_owner} is working on it")
+            return False
+        self.lease_held = True
+        self.lease_keeper.add(self.item_id)
+        # another station sharing the database may have run the task since the items were loaded
+        progress = get_item_progress(self.item_id, connection_name=connection_name)
+        if progress[self.task] == 1:
+            finish_job(self.job_id, connection_name=connection_name)
+            self.signals.item_progress.emit(progress)
+            self.signals.status.emit(f"skipping {self.message} for {self.item.item_identifier}: already done by another station")
+            return False
+        return True
+
     def get_task_settings(self):
-        task_settings = {
-            "copy": {"function": self.item.copy_item_to_remote_dir, "message": "copying files"},
-            "derivatives": {"function": self.item.generate_derivatives, "message": "generating derivatives"},
-            "rename": {"function": self.item.rename_preservation_scans, "message": "renaming files"},
-            "complete": {"function": self.item.check_complete, "message": "checking completeness"}
+        return get_task_settings(self.item, self.task)
+
+    def emit_task_run(self, started_at, outcome, error=None):
+        finished_at = time.time()
+        task_run = {
+            "task": self.task,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "duration": finished_at - started_at,
+            "outcome": outcome,
+            "error": error
         }
+        task_run.update(self.item.get_run_metrics())
+        self.signals.task_run.emit(task_run)
+
+    def use_process_pool(self):
+        # in page mode the item's pages are sent to the process pool instead of the whole task
+        if self.item.config.get("derivative_mode") == "pages":
+            return False
+        return self.task in PROCESS_TASKS and self.item.config.get("worker_processes", 0) > 0
+
+    def run_in_process_pool(self):
+        process_pool = get_process_pool(self.item.config["worker_processes"])
+        try:
+            future = process_pool.submit(
+                run_task, self.item.project_dir, self.item.item_identifier,
+                self.item.config, self.task, self.item.manifest
+            )
+            # this thread just waits, so the GUI process does no image processing itself
+            result = future.result()
+        except BrokenProcessPool:
+            discard_broken_process_pool(process_pool)
+            raise RuntimeError(f"a worker process stopped unexpectedly while {self.message} for {self.item.item_identifier}")
+        if "files" in result:
+            self.item.manifest = result["files"]
+        self.item.bytes_processed = result["task_run"]["bytes_processed"]
+        return result["response"]
+
+
+class ImportWorker(QRunnable):
+
+    def __init__(self, project, project_id):
+        super().__init__()
+        self.project = project
+        self.project_id = project_id
+        self.is_cancelled = False
+        self.signals = WorkerSignals()
+
+    def cancel(self):
+        self.is_cancelled = True
 
-        return task_settings[self.task]
+    @pyqtSlot()
+    def run(self):
+        connection_name = f"import-{self.project_id}"
+        try:
+            # create the item directories while the items are loaded into the database
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                setup = executor.submit(self.project.setup_project)
+                open_connection(connection_name)
+                try:
+                    imported = create_items(
+                        self.project.items, self.project_id,
+                        connection_name=connection_name,
+                        progress_callback=self.signals.progress.emit,
+                        is_cancelled=lambda: self.is_cancelled
+                    )
+                finally:
+                    close_connection(connection_name)
+                setup.result()
+            if imported:
+                self.signals.success.emit(f"imported {len(self.project.items)} items")
+            else:
+                self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        finally:
+            self.signals.finished.emit()
 
 
 class QTextEditLogger(logging.Handler):
-    def __init__(self, parent):
+    # Records can arrive from any thread, so emit only buffers them and a timer
+    # on the GUI thread appends whatever has accumulated in one batch. The
+    # widget keeps at most max_lines lines; the session log file keeps the rest.
+    def __init__(self, parent, max_lines=5000, flush_interval=200):
         super().__init__()
         self.widget = QPlainTextEdit(parent)
         self.widget.setReadOnly(True)
+        self.widget.setMaximumBlockCount(max_lines)
+        self.pending = deque(maxlen=max_lines)
+        self.timer = QTimer(self.widget)
+        self.timer.setInterval(flush_interval)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+        self.widget.destroyed.connect(self.detach)
+
+    def detach(self):
+        logging.getLogger().removeHandler(self)
 
     def emit(self, record):
-        msg = self.format(record)
-        self.widget.appendPlainText(msg)
+        try:
+            self.pending.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            messages = list(self.pending)
+            self.pending.clear()
+        finally:
+            self.release()
+        # logging.shutdown flushes every handler at exit, after Qt may have deleted the widget
+        if messages and not sip.isdeleted(self.widget):
+            self.widget.appendPlainText("\n".join(messages))
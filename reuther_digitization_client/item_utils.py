@@ -0,0 +1,190 @@
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import os
+import threading
+
+from reuther_digitization_utils.item_utils import ItemUtils
+
+from reuther_digitization_client.database import (
+    close_connection,
+    create_rename_journal,
+    delete_rename_journal,
+    get_item_id,
+    get_rename_journal,
+    open_connection,
+    set_rename_journal_state
+)
+from reuther_digitization_client.derivative_cache import get_derivative_cache
+from reuther_digitization_client.derivatives import PDF_TYPE, generate_page_derivatives
+from reuther_digitization_client.fixity import build_manifest, file_checksum, matches_manifest_entry, verify_manifest
+from reuther_digitization_client.pdf import build_pdf
+from reuther_digitization_client.process_pool import discard_broken_process_pool, get_process_pool
+from reuther_digitization_client.rename_plan import move_to_new_names, move_to_temp_names, plan_renames
+from reuther_digitization_client.transfer import TransferEngine
+
+
+class ClientItemUtils(ItemUtils):
+    # Extends ItemUtils with the client's own implementations of some tasks.
+    def __init__(self, project_dir, item_identifier, remote_scans_dir=None, config=None):
+        super().__init__(project_dir, item_identifier, remote_scans_dir=remote_scans_dir)
+        config = config or {}
+        self.config = config
+        self.project_dir = project_dir
+        self.item_dir = os.path.join(project_dir, item_identifier)
+        self.remote_item_dir = None
+        if remote_scans_dir:
+            self.remote_item_dir = os.path.join(remote_scans_dir, item_identifier)
+        self.transfer_jobs = config.get("transfer_jobs", 4)
+        self.transfer_verify = config.get("transfer_verify", "mtime")
+        self.transfer_bundle_max_file_size = 0
+        if config.get("transfer_bundle", False):
+            self.transfer_bundle_max_file_size = config.get("transfer_bundle_max_file_size", 1024 * 1024)
+        self.derivative_types = config.get("derivative_types", ["jp2"])
+        self.derivative_mode = config.get("derivative_mode", "item")
+        self.rename_pattern = config.get("rename_pattern", "")
+        # fixity manifest of the preservation scans, keyed by path relative to item_dir
+        self.manifest = {}
+        # set by tasks that know exactly how many bytes they moved
+        self.bytes_processed = None
+
+    def rename_preservation_scans(self):
+        if self.rename_pattern:
+            return self.rename_with_journal()
+        response = super().rename_preservation_scans()
+        self.manifest = build_manifest(self.item_dir, self.get_tiff_filepaths())
+        return response
+
+    def rename_with_journal(self):
+        # The plan is recorded before any file is touched, so a rename that was
+        # interrupted is finished from the journal instead of being redone.
+        preservation_dir = os.path.join(self.item_dir, "preservation")
+        previous_manifest = self.manifest
+        connection_name = f"rename-{threading.get_ident()}"
+        open_connection(connection_name)
+        try:
+            item_id = get_item_id(self.project_dir, self.item_identifier, connection_name=connection_name)
+            if item_id is None:
+                raise ValueError(f"{self.item_identifier} is not in the project database")
+            plan = get_rename_journal(item_id, connection_name=connection_name)
+            resumed = bool(plan)
+            if not resumed:
+                plan = plan_renames(preservation_dir, self.item_identifier, self.rename_pattern)
+                create_rename_journal(item_id, plan, connection_name=connection_name)
+            move_to_temp_names(preservation_dir, plan)
+            set_rename_journal_state(item_id, "temp", connection_name=connection_name)
+            move_to_new_names(preservation_dir, plan)
+            delete_rename_journal(item_id, connection_name=connection_name)
+        finally:
+            close_connection(connection_name)
+        renamed_paths = dict(
+            (os.path.join("preservation", entry["new_name"]), os.path.join("preservation", entry["old_name"]))
+            for entry in plan
+        )
+        self.manifest = self.build_manifest_after_rename(previous_manifest, renamed_paths)
+        response = f"renamed {len(plan)} of {len(self.manifest)} files"
+        if resumed:
+            response += " (resumed an interrupted rename)"
+        return response
+
+    def build_manifest_after_rename(self, previous_manifest, renamed_paths):
+        # renaming keeps size and mtime, so checksums only need to be computed for new or changed files
+        manifest = {}
+        for filepath in self.get_tiff_filepaths():
+            relative_path = os.path.relpath(filepath, self.item_dir)
+            entry = previous_manifest.get(renamed_paths.get(relative_path, relative_path))
+            if entry and matches_manifest_entry(filepath, entry):
+                manifest[relative_path] = dict(entry)
+            else:
+                manifest.update(build_manifest(self.item_dir, [filepath]))
+        return manifest
+
+    def generate_derivatives(self):
+        if self.derivative_mode != "pages":
+            response = super().generate_derivatives()
+            if PDF_TYPE in self.derivative_types:
+                # ItemUtils still generates the other types; only the PDF needs the streaming writer
+                response = ", ".join([response, self.write_derivatives(self.get_tiff_filepaths(), [PDF_TYPE])])
+            return response
+        source_paths = self.get_tiff_filepaths()
+        # convert the pages of a single item on every core so that large items do not run on one
+        executor = get_process_pool(self.config.get("worker_processes") or os.cpu_count() or 1)
+        try:
+            return self.write_derivatives(source_paths, self.derivative_types, executor)
+        except BrokenProcessPool:
+            discard_broken_process_pool(executor)
+            raise RuntimeError(f"a worker process stopped unexpectedly while generating derivatives for {self.item_identifier}")
+
+    def write_derivatives(self, source_paths, derivative_types, executor=None):
+        cache = get_derivative_cache(self.config)
+        checksums = self.get_page_checksums(source_paths) if cache else None
+        pdf_args = None
+        pdf_future = None
+        pdf_key = None
+        if PDF_TYPE in derivative_types:
+            pdf_path = os.path.join(self.item_dir, PDF_TYPE, f"{self.item_identifier}.pdf")
+            pdf_args = (source_paths, pdf_path, self.config.get("pdf_dpi", 150), self.config.get("pdf_quality", 75))
+            if cache:
+                # the PDF is only reused as a whole, when none of its pages changed
+                pdf_key = cache.get_key(hashlib.sha256("".join(checksums).encode()).hexdigest(), f"pdf:{pdf_args[2]}:{pdf_args[3]}")
+                if cache.fetch(pdf_key, ".pdf", pdf_path):
+                    pdf_args = None
+            if pdf_args and executor:
+                # the PDF is built page by page in one worker while the other workers convert pages
+                pdf_future = executor.submit(build_pdf, *pdf_args)
+        responses = []
+        for derivative_type in derivative_types:
+            if derivative_type == PDF_TYPE:
+                continue
+            output_dir = os.path.join(self.item_dir, derivative_type)
+            generate_page_derivatives(source_paths, output_dir, derivative_type, executor=executor, cache=cache, checksums=checksums)
+            responses.append(f"{len(source_paths)} {derivative_type} derivatives generated")
+        if pdf_future:
+            pdf_future.result()
+        elif pdf_args:
+            build_pdf(*pdf_args)
+        if pdf_args and cache:
+            cache.store(pdf_path, pdf_key, ".pdf")
+        if PDF_TYPE in derivative_types:
+            responses.append(f"{len(source_paths)} page PDF generated")
+        self.bytes_processed = sum(os.path.getsize(source_path) for source_path in source_paths)
+        if cache:
+            evicted = cache.evict()
+            responses.append(f"{cache}, {evicted} evicted")
+        return ", ".join(responses)
+
+    def get_page_checksums(self, source_paths):
+        # reuse the checksums recorded when the scans were renamed for pages that have not changed since
+        checksums = []
+        for source_path in source_paths:
+            entry = self.manifest.get(os.path.relpath(source_path, self.item_dir))
+            if entry and matches_manifest_entry(source_path, entry):
+                checksums.append(entry["checksum"])
+            else:
+                checksums.append(file_checksum(source_path))
+        return checksums
+
+    def copy_item_to_remote_dir(self):
+        if not self.remote_item_dir:
+            raise ValueError("No remote scans directory configured")
+        engine = TransferEngine(
+            self.item_dir, self.remote_item_dir,
+            jobs=self.transfer_jobs, verify=self.transfer_verify,
+            manifest=self.manifest, bundle_max_file_size=self.transfer_bundle_max_file_size
+        )
+        stats = engine.run()
+        self.bytes_processed = stats.bytes_copied
+        return str(stats)
+
+    def check_complete(self):
+        if not self.manifest:
+            return super().check_complete()
+        errors = verify_manifest(self.remote_item_dir, self.manifest)
+        if errors:
+            raise ValueError(f"{self.item_identifier} is incomplete: {'; '.join(errors)}")
+        return f"{len(self.manifest)} files match the fixity manifest"
+
+    def get_run_metrics(self):
+        bytes_processed = self.bytes_processed
+        if bytes_processed is None:
+            bytes_processed = sum(entry["size"] for entry in self.manifest.values())
+        return {"page_count": len(self.manifest), "bytes_processed": bytes_processed}
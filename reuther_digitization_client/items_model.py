@@ -0,0 +1,336 @@
+from bisect import bisect_left
+
+from PyQt5.QtCore import (
+    QAbstractTableModel,
+    QEvent,
+    QModelIndex,
+    QPersistentModelIndex,
+    QSize,
+    QSortFilterProxyModel,
+    Qt,
+    pyqtSignal
+)
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton
+
+from reuther_digitization_client.database import count_project_items, get_project_items
+
+
+ItemIdRole = Qt.UserRole + 1
+ButtonStateRole = Qt.UserRole + 2
+
+BUTTON_DISABLED = 0
+BUTTON_ENABLED = 1
+TASK_COMPLETE = 2
+
+TASK_DONE = "Done"
+TASK_NEXT = "Next"
+TASK_WAITING = "Waiting"
+TASK_STATES = [TASK_DONE, TASK_NEXT, TASK_WAITING]
+
+
+class ItemsModel(QAbstractTableModel):
+    def __init__(self, tasks, task_labels, headers, parent=None, batch_size=200):
+        super().__init__(parent)
+        self.tasks = tasks
+        self.task_labels = task_labels
+        self.headers = headers
+        self.batch_size = batch_size
+        self.open_column = 4
+        self.first_task_column = 5
+        self.reset_column = self.first_task_column + len(self.tasks)
+        self.task_columns = list(range(self.first_task_column, self.reset_column))
+        # box, folder and the task columns can be filtered by value
+        self.filter_columns = [1, 2] + self.task_columns
+        self.project_id = None
+        self.item_count = 0
+        self.items = []
+        self.item_rows = {}
+        self.busy_item_ids = set()
+        self.clear_indexes()
+
+    def load(self, project_id):
+        self.beginResetModel()
+        self.project_id = project_id
+        self.item_count = count_project_items(project_id)
+        self.items = []
+        self.item_rows = {}
+        self.busy_item_ids = set()
+        self.clear_indexes()
+        self.endResetModel()
+
+    def clear_indexes(self):
+        # filter value -> set of rows, per filterable column
+        self.value_rows = dict((column, {}) for column in self.filter_columns)
+        # lowercased titles by row for free-text search
+        self.search_titles = []
+        # (lowercased identifier, row) pairs, sorted on first use
+        self.sorted_identifiers = None
+
+    def index_item(self, row, item):
+        for column in self.filter_columns:
+            self.value_rows[column].setdefault(self.get_filter_value(item, column), set()).add(row)
+        self.search_titles.append((item["display_string"] or "").lower())
+        self.sorted_identifiers = None
+
+    def get_filter_value(self, item, column):
+        if column in self.task_columns:
+            return self.get_task_state(item, column - self.first_task_column)
+        return self.get_text(item, column)
+
+    def get_task_state(self, item, task_index):
+        completed_tasks = self.count_completed_tasks(item)
+        if task_index < completed_tasks:
+            return TASK_DONE
+        elif task_index == completed_tasks:
+            return TASK_NEXT
+        return TASK_WAITING
+
+    def get_filter_values(self, column):
+        if column in self.task_columns:
+            return TASK_STATES
+        return sorted(self.value_rows[column], key=lambda value: (value or "").zfill(10))
+
+    def filter_rows(self, value_filters, identifier_prefix="", title_text=""):
+        # returns the rows matching every filter, or None if nothing is filtered
+        rows = None
+        for column, values in value_filters.items():
+            if not values:
+                continue
+            column_rows = set()
+            for value in values:
+                column_rows |= self.value_rows[column].get(value, set())
+            rows = column_rows if rows is None else rows & column_rows
+        if identifier_prefix:
+            prefix_rows = self.rows_with_identifier_prefix(identifier_prefix.lower())
+            rows = prefix_rows if rows is None else rows & prefix_rows
+        if title_text:
+            title_text = title_text.lower()
+            candidates = range(len(self.search_titles)) if rows is None else rows
+            rows = set(row for row in candidates if title_text in self.search_titles[row])
+        return rows
+
+    def rows_with_identifier_prefix(self, prefix):
+        if self.sorted_identifiers is None:
+            self.sorted_identifiers = sorted((item["identifier"].lower(), row) for row, item in enumerate(self.items))
+        rows = set()
+        position = bisect_left(self.sorted_identifiers, (prefix, -1))
+        while position < len(self.sorted_identifiers) and self.sorted_identifiers[position][0].startswith(prefix):
+            rows.add(self.sorted_identifiers[position][1])
+            position += 1
+        return rows
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.items)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            if orientation == Qt.Horizontal:
+                return self.headers[section]
+            else:
+                return section + 1
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return len(self.items) < self.item_count
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        after_id = self.items[-1]["id"] if self.items else 0
+        items = get_project_items(self.project_id, limit=self.batch_size, after_id=after_id)
+        if not items:
+            # items were removed since the count was taken
+            self.item_count = len(self.items)
+            return
+        first_row = len(self.items)
+        self.beginInsertRows(QModelIndex(), first_row, first_row + len(items) - 1)
+        for row, item in enumerate(items, start=first_row):
+            self.items.append(item)
+            self.item_rows[item["id"]] = row
+            self.index_item(row, item)
+        self.endInsertRows()
+
+    def fetch_all(self):
+        while self.canFetchMore():
+            self.fetchMore()
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        column = index.column()
+        if role == ItemIdRole:
+            return item["id"]
+        if column < self.open_column:
+            if role == Qt.DisplayRole:
+                return self.get_text(item, column)
+            return None
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if column == self.open_column:
+            if role == Qt.DisplayRole:
+                return "Open"
+            elif role == ButtonStateRole:
+                return BUTTON_ENABLED
+        elif column == self.reset_column:
+            if role == Qt.DisplayRole:
+                return "Reset"
+            elif role == ButtonStateRole:
+                if item["id"] in self.busy_item_ids:
+                    return BUTTON_DISABLED
+                return BUTTON_ENABLED
+        else:
+            task_index = column - self.first_task_column
+            completed_tasks = self.count_completed_tasks(item)
+            if role == Qt.DisplayRole:
+                if task_index < completed_tasks:
+                    return "✓"
+                return self.task_labels[task_index]
+            elif role == ButtonStateRole:
+                if task_index < completed_tasks:
+                    return TASK_COMPLETE
+                elif task_index == completed_tasks and item["id"] not in self.busy_item_ids:
+                    return BUTTON_ENABLED
+                else:
+                    return BUTTON_DISABLED
+        return None
+
+    def get_text(self, item, column):
+        if column == 0:
+            # hack until I figure out why Qt is removing spaces after commas
+            return (item["display_string"] or "").replace(", ", ",  ")
+        elif column == 1:
+            return item["box"]
+        elif column == 2:
+            return item["folder"]
+        else:
+            return item["identifier"]
+
+    def count_completed_tasks(self, item):
+        completed_tasks = 0
+        for task in self.tasks:
+            if item[task] == 1:
+                completed_tasks += 1
+        return completed_tasks
+
+    def get_item(self, item_id):
+        return self.items[self.item_rows[item_id]]
+
+    def get_task(self, column):
+        return self.tasks[column - self.first_task_column]
+
+    def is_task_column(self, column):
+        return self.first_task_column <= column < self.reset_column
+
+    def set_item_progress(self, item_id, progress):
+        if item_id not in self.item_rows:
+            return
+        row = self.item_rows[item_id]
+        item = self.get_item(item_id)
+        for column in self.task_columns:
+            self.value_rows[column][self.get_filter_value(item, column)].discard(row)
+        item.update(progress)
+        for column in self.task_columns:
+            self.value_rows[column].setdefault(self.get_filter_value(item, column), set()).add(row)
+        self.emit_task_columns_changed(item_id)
+
+    def set_item_busy(self, item_id, busy):
+        if busy:
+            self.busy_item_ids.add(item_id)
+        else:
+            self.busy_item_ids.discard(item_id)
+        if item_id in self.item_rows:
+            self.emit_task_columns_changed(item_id)
+
+    def emit_task_columns_changed(self, item_id):
+        row = self.item_rows[item_id]
+        self.dataChanged.emit(
+            self.index(row, self.first_task_column),
+            self.index(row, self.reset_column),
+            [Qt.DisplayRole, ButtonStateRole]
+        )
+
+
+class ItemsFilterModel(QSortFilterProxyModel):
+    # Shows only the source rows in accepted_rows, which ItemsModel.filter_rows
+    # computes from its indexes, so a filter change is a single invalidation
+    # instead of a per-row walk over the table.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.accepted_rows = None
+
+    def set_accepted_rows(self, rows):
+        self.accepted_rows = rows
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.accepted_rows is None or source_row in self.accepted_rows
+
+    def source_rows(self, indexes):
+        return sorted(set(self.mapToSource(index).row() for index in indexes))
+
+    def visible_source_rows(self):
+        if self.accepted_rows is None:
+            return list(range(self.sourceModel().rowCount()))
+        return sorted(self.accepted_rows)
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    clicked = pyqtSignal(QModelIndex)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pressed_index = None
+
+    def paint(self, painter, option, index):
+        state = index.data(ButtonStateRole)
+        if state is None or state == TASK_COMPLETE:
+            super().paint(painter, option, index)
+            return
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = index.data(Qt.DisplayRole)
+        if state == BUTTON_ENABLED:
+            button.state = QStyle.State_Enabled
+            if self.pressed_index is not None and self.pressed_index == QPersistentModelIndex(index):
+                button.state |= QStyle.State_Sunken
+            else:
+                button.state |= QStyle.State_Raised
+        else:
+            button.state = QStyle.State_None
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, button, painter, option.widget)
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        if index.data(ButtonStateRole) in [BUTTON_ENABLED, BUTTON_DISABLED]:
+            return QSize(size.width() + 24, max(size.height(), 28))
+        return size
+
+    def editorEvent(self, event, model, option, index):
+        if index.data(ButtonStateRole) != BUTTON_ENABLED:
+            return False
+        if event.type() == QEvent.MouseButtonPress and event.button() == Qt.LeftButton:
+            self.pressed_index = QPersistentModelIndex(index)
+            return True
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            was_pressed = self.pressed_index == QPersistentModelIndex(index)
+            self.pressed_index = None
+            if was_pressed and option.rect.contains(event.pos()):
+                self.clicked.emit(QModelIndex(index))
+            return True
+        return False
@@ -3,30 +3,24 @@ import logging
 import os
 import subprocess
 
-from reuther_digitization_utils.item_utils import ItemUtils
-
-from PyQt5.QtCore import Qt, QPoint
+from PyQt5.QtCore import Qt, QPoint, QTimer
 from PyQt5.QtWidgets import (
     QCheckBox,
     QDialogButtonBox,
     QHeaderView,
-    QLabel,
     QMenu,
     QPushButton,
-    QTableWidget,
-    QTableWidgetItem,
     QWidget,
     QWidgetAction
 )
 
-from reuther_digitization_client.database import (
-    get_item_progress,
-    get_project_items,
-    reset_task_progress,
-    update_item_page_count,
-    update_item_progress
-)
+from reuther_digitization_client.database import cancel_jobs, get_items_needing_task, get_queued_jobs
+from reuther_digitization_client.dispatcher import TaskDispatcher
 from reuther_digitization_client.helpers import TaskWorker, QTextEditLogger
+from reuther_digitization_client.items_model import ButtonDelegate, ItemIdRole, ItemsFilterModel, ItemsModel
+from reuther_digitization_client.session_log import LOG_DATE_FORMAT, LOG_FORMAT
+from reuther_digitization_client.tasks import TASK_HEADERS, TASK_LABELS, TASKS, get_next_task, get_tasks, make_item
+from reuther_digitization_client.watcher import ItemWatcher
 
 from reuther_digitization_client.ui.items import Ui_Items
 
@@ -36,74 +30,135 @@ class Items(QWidget, Ui_Items):
         super().__init__(parent)
         self.setupUi(self)
         self.digitization_client = DigitizationClient
+        self.db_writer = DigitizationClient.db_writer
+        # the task each item last completed, until its worker has finished
+        self.succeeded_tasks = {}
         self.projectsBtn.clicked.connect(self.digitization_client.show_projects)
+        self.project_id = None
         self.project_dir = None
-        self.row_buttons = {}
-        self.row_to_item_ids = {}
-        self.row_to_item_identifiers = {}
-        # only filter box column
-        self.allowed_filter_indexes = [1]
-        self.scan_storage_location = DigitizationClient.config.get("scan_storage_location")
+        # filterable column -> set of values to show
+        self.value_filters = {}
 
         generate_derivatives = DigitizationClient.config.get("generate_derivatives")
-        if generate_derivatives:
-            self.tasks = ["rename", "derivatives", "copy", "complete"]
-            self.task_labels = ["Rename Files", "Generate Derivatives", "Copy to HOLD", "Complete"]
-            self.headers = ["Title/Dates", "Box", "Folder", "Identifier", "Open", "Rename", "Derivatives", "Copy", "Complete", "Reset"]
-        else:
-            self.tasks = ["rename", "copy", "complete"]
-            self.task_labels = ["Rename Files", "Copy to HOLD", "Complete"]
-            self.headers = ["Title/Dates", "Box", "Folder", "Identifier", "Open", "Rename", "Copy", "Complete", "Reset"]
+        self.tasks = get_tasks(generate_derivatives)
+        self.task_labels = [TASK_LABELS[task] for task in self.tasks]
+        self.headers = ["Title/Dates", "Box", "Folder", "Identifier", "Open"]
+        self.headers += [TASK_HEADERS[task] for task in self.tasks]
+        self.headers.append("Reset")
+
+        self.model = ItemsModel(self.tasks, self.task_labels, self.headers, self)
+        self.filter_model = ItemsFilterModel(self)
+        self.filter_model.setSourceModel(self.model)
+        self.itemsTable.setModel(self.filter_model)
+        self.delegate = ButtonDelegate(self.itemsTable)
+        self.delegate.clicked.connect(self.onCellClicked)
+        self.itemsTable.setItemDelegate(self.delegate)
+        self.horizontalHeader = self.itemsTable.horizontalHeader()
+        self.horizontalHeader.sectionClicked.connect(self.onHeaderClicked)
+        self.horizontalHeader.setSectionResizeMode(QHeaderView.Stretch)
+        for i in range(1, len(self.headers)):
+            self.horizontalHeader.setSectionResizeMode(i, QHeaderView.ResizeToContents)
 
-        logTextBox = QTextEditLogger(self)
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt="%Y-%m-%d %H:%M:%S")
+        config = DigitizationClient.config
+        task_jobs = config.get("task_jobs", {})
+        task_jobs = dict((task, task_jobs.get(task, 1)) for task in self.tasks)
+        threadpool = self.digitization_client.threadpool
+        threadpool.setMaxThreadCount(max(threadpool.maxThreadCount(), sum(task_jobs.values())))
+        self.dispatcher = TaskDispatcher(self.make_worker, task_jobs, threadpool, config["station_id"], self)
+        self.dispatcher.progress.connect(self.update_task_progress)
+        self.dispatcher.item_finished.connect(self.set_task_states_after_thread)
+        self.taskProgressBar.setVisible(False)
+        self.runSelectedBtn.clicked.connect(self.run_selected)
+        self.runVisibleBtn.clicked.connect(self.run_visible)
+        self.cancelQueuedBtn.clicked.connect(self.cancel_queued)
+
+        # wait for a pause in typing before filtering
+        self.filterTimer = QTimer(self)
+        self.filterTimer.setSingleShot(True)
+        self.filterTimer.setInterval(250)
+        self.filterTimer.timeout.connect(self.filterdata)
+        self.titleSearchEdit.textChanged.connect(self.filterTimer.start)
+        self.identifierFilterEdit.textChanged.connect(self.filterTimer.start)
+        self.clearFiltersBtn.clicked.connect(self.clearAllFilters)
+
+        self.watcher = ItemWatcher(config.get("watch_debounce_seconds", 30), self)
+        self.watcher.page_count_changed.connect(self.update_watched_page_count)
+        self.watcher.item_ready.connect(self.start_watched_rename)
+        self.auto_derivatives = config.get("watch_auto_derivatives") and "derivatives" in self.tasks
+        self.auto_derivative_item_ids = set()
+        self.watchCheckBox.setChecked(bool(config.get("watch_folders")))
+        self.watchCheckBox.toggled.connect(self.set_watching)
+
+        logTextBox = QTextEditLogger(self, max_lines=config.get("log_max_lines", 5000))
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
         logTextBox.setFormatter(formatter)
         logging.getLogger().addHandler(logTextBox)
         logging.getLogger().setLevel(logging.INFO)
         self.loggerLayout.addWidget(logTextBox.widget)
 
     def load_items(self, project_id, project_dir):
+        self.db_writer.wait_for_flush()
+        self.project_id = project_id
         self.project_dir = project_dir
-        self.itemsTable.clear()
-        self.itemsTable.setRowCount(0)
-        self.horizontalHeader = self.itemsTable.horizontalHeader()
-        self.horizontalHeader.sectionClicked.connect(self.onHeaderClicked)
-        self.itemsTable.setHorizontalHeaderLabels(self.headers)
-        self.itemsTable.setAlternatingRowColors(True)
-        self.itemsTable.setEditTriggers(QTableWidget.NoEditTriggers)
-        items = get_project_items(project_id)
-        row_position = 0
-        for item in items:
-            self.itemsTable.insertRow(row_position)
-            self.row_to_item_ids[row_position] = item["id"]
-            item_identifier = item["identifier"]
-            self.row_to_item_identifiers[row_position] = item_identifier
-            display_string = item["display_string"]
-            # hack until I figure out why Qt is removing spaces after commas
-            display_string = display_string.replace(", ", ",  ")
-            self.itemsTable.setItem(row_position, 0, QTableWidgetItem(display_string))
-            self.itemsTable.setItem(row_position, 1, QTableWidgetItem(item["box"]))
-            self.itemsTable.setItem(row_position, 2, QTableWidgetItem(item["folder"]))
-            self.itemsTable.setItem(row_position, 3, QTableWidgetItem(item["identifier"]))
-            item_dir = os.path.join(self.project_dir, item_identifier)
-            openDirBtn = QPushButton("Open")
-            openDirBtn.clicked.connect(partial(self.try_open_folder, item_dir))
-            self.itemsTable.setCellWidget(row_position, 4, openDirBtn)
-            task_widgets = self.make_task_widgets(row_position, item)
-            task_widget_range = len(task_widgets)
-            col_start = 5
-            col_end = col_start + task_widget_range
-            for task_i, col_i in zip(list(range(task_widget_range)), list(range(col_start, col_end))):
-                self.itemsTable.setCellWidget(row_position, col_i, task_widgets[task_i])
-            resetItemBtn = QPushButton("Reset")
-            resetItemBtn.clicked.connect(partial(self.reset_item, row_position))
-            self.itemsTable.setCellWidget(row_position, col_end, resetItemBtn)
-            row_position += 1
-        self.keywords = dict([(i, []) for i in range(self.itemsTable.columnCount())])
-        self.horizontalHeader.setSectionResizeMode(QHeaderView.Stretch)
-        for i in range(1, 10):
-            self.horizontalHeader.setSectionResizeMode(i, QHeaderView.ResizeToContents)
-        self.itemsTable.resizeColumnsToContents()
+        self.model.load(project_id)
+        self.clearAllFilters()
+        self.set_watching(self.watchCheckBox.isChecked())
+        self.resume_queued_jobs()
+
+    def resume_queued_jobs(self):
+        jobs = get_queued_jobs(self.project_id, self.dispatcher.owner)
+        resumed_jobs = []
+        stale_job_ids = []
+        for job in jobs:
+            if job["task"] not in self.tasks or job["progress"][job["task"]] == 1 or job["item_id"] in self.model.busy_item_ids:
+                stale_job_ids.append(job["id"])
+            else:
+                resumed_jobs.append(job)
+                self.model.set_item_busy(job["item_id"], True)
+        if stale_job_ids:
+            cancel_jobs(stale_job_ids)
+        if resumed_jobs:
+            self.projectsBtn.setEnabled(False)
+            logging.info(f"resuming {len(resumed_jobs)} queued tasks from a previous session")
+        for job in resumed_jobs:
+            self.dispatcher.submit(job["item_id"], job["identifier"], job["task"], job_id=job["id"])
+
+    def set_watching(self, watching):
+        self.watcher.clear()
+        self.auto_derivative_item_ids = set()
+        if watching and self.project_id is not None:
+            items = get_items_needing_task(self.project_id, self.tasks, "rename")
+            for item in items:
+                item_dir = os.path.join(self.project_dir, item["identifier"])
+                self.watcher.watch(item["id"], item["identifier"], item_dir)
+            logging.info(f"watching {len(items)} item folders for new scans")
+
+    def update_watched_page_count(self, item_id, page_count):
+        self.db_writer.set_page_count(item_id, page_count)
+
+    def start_watched_rename(self, item_id, identifier):
+        if item_id in self.model.busy_item_ids:
+            return
+        if item_id in self.model.item_rows and self.model.get_item(item_id)["rename"] == 1:
+            # renamed since the folder was first watched
+            self.watcher.unwatch(item_id)
+            return
+        logging.info(f"scanning finished for {identifier}")
+        if self.auto_derivatives:
+            self.auto_derivative_item_ids.add(item_id)
+        self.start_worker("rename", item_id, identifier)
+
+    def onCellClicked(self, index):
+        item_id = index.data(ItemIdRole)
+        column = index.column()
+        if column == self.model.open_column:
+            item = self.model.get_item(item_id)
+            self.try_open_folder(os.path.join(self.project_dir, item["identifier"]))
+        elif column == self.model.reset_column:
+            self.reset_item(item_id)
+        elif self.model.is_task_column(column):
+            identifier = self.model.get_item(item_id)["identifier"]
+            self.start_worker(self.model.get_task(column), item_id, identifier)
 
     def try_open_folder(self, directory):
         if os.path.exists(directory):
@@ -112,11 +167,9 @@ class Items(QWidget, Ui_Items):
             logging.error(f"Directory does not exist: {directory}")
 
     def onHeaderClicked(self, index):
-        # only filter box column
-        if index in self.allowed_filter_indexes:
+        if index in self.model.filter_columns:
             self.menu = QMenu(self)
             self.col = index
-            data_unique = []
             self.checkBoxes = []
 
             deselectBtn = QPushButton("Deselect all")
@@ -125,16 +178,16 @@ class Items(QWidget, Ui_Items):
             deselectAction.setDefaultWidget(deselectBtn)
             self.menu.addAction(deselectAction)
 
-            for i in range(self.itemsTable.rowCount()):
-                item = self.itemsTable.item(i, index)
-                if item.text() not in data_unique:
-                    data_unique.append(item.text())
-                    checkbox = QCheckBox(item.text(), self.menu)
-                    checkbox.setChecked(not self.itemsTable.isRowHidden(i))
-                    checkableAction = QWidgetAction(self.menu)
-                    checkableAction.setDefaultWidget(checkbox)
-                    self.menu.addAction(checkableAction)
-                    self.checkBoxes.append(checkbox)
+            # filtering applies to the whole project, not just the rows fetched so far
+            self.model.fetch_all()
+            selected_values = self.value_filters.get(index)
+            for value in self.model.get_filter_values(index):
+                checkbox = QCheckBox(value, self.menu)
+                checkbox.setChecked(not selected_values or value in selected_values)
+                checkableAction = QWidgetAction(self.menu)
+                checkableAction.setDefaultWidget(checkbox)
+                self.menu.addAction(checkableAction)
+                self.checkBoxes.append(checkbox)
 
             dialogBtn = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel,
                                         Qt.Horizontal, self.menu)
@@ -161,121 +214,120 @@ class Items(QWidget, Ui_Items):
             checkbox.setChecked(False)
 
     def clearFilter(self):
-        for i in range(self.itemsTable.rowCount()):
-            self.itemsTable.setRowHidden(i, False)
+        self.value_filters.pop(self.col, None)
+        self.filterdata()
         self.menu.close()
 
+    def clearAllFilters(self):
+        self.value_filters = {}
+        # block the text signals so that clearing both fields filters once
+        for line_edit in [self.titleSearchEdit, self.identifierFilterEdit]:
+            line_edit.blockSignals(True)
+            line_edit.clear()
+            line_edit.blockSignals(False)
+        self.filterTimer.stop()
+        self.filterdata()
+
     def filterAndClose(self):
-        self.keywords[self.col] = []
-        for element in self.checkBoxes:
-            if element.isChecked():
-                self.keywords[self.col].append(element.text())
+        values = set(checkbox.text() for checkbox in self.checkBoxes if checkbox.isChecked())
+        if len(values) == len(self.checkBoxes):
+            self.value_filters.pop(self.col, None)
+        else:
+            self.value_filters[self.col] = values
         self.filterdata()
         self.menu.close()
 
     def filterdata(self):
-        columnsShow = dict([(i, True) for i in range(self.itemsTable.rowCount())])
-        for i in range(self.itemsTable.rowCount()):
-            for j in self.allowed_filter_indexes:
-                if self.keywords[j]:
-                    item = self.itemsTable.item(i, j)
-                    if item.text() not in self.keywords[j]:
-                        columnsShow[i] = False
-        for key, value in columnsShow.items():
-            self.itemsTable.setRowHidden(key, not value)
-
-    def make_task_widgets(self, row_position, item):
-        task_widgets = []
-        buttons = []
-        completed_tasks = self.count_completed_tasks(item)
-        for i in range(completed_tasks):
-            task_label = self.make_task_complete_label()
-            task_widgets.append(task_label)
-        for i in range(completed_tasks, len(self.tasks)):
-            task = self.tasks[i]
-            label = self.task_labels[i]
-            button = QPushButton(label)
-            if i == completed_tasks:
-                button.setEnabled(True)
-            else:
-                button.setEnabled(False)
-            button.clicked.connect(partial(self.start_worker, task, row_position))
-            task_widgets.append(button)
-            buttons.append(button)
-        self.row_buttons[row_position] = buttons
-        return task_widgets
-
-    def set_task_states(self, item, row_position):
-        completed_tasks = self.count_completed_tasks(item)
-        remaining_tasks = len(self.tasks) - completed_tasks
-        difference = len(self.row_buttons[row_position]) - remaining_tasks
-        self.row_buttons[row_position] = self.row_buttons[row_position][difference:]
-        for i in range(completed_tasks):
-            column = i + 5
-            task_label = self.make_task_complete_label()
-            self.itemsTable.setCellWidget(row_position, column, task_label)
-        if remaining_tasks > 0:
-            self.row_buttons[row_position][0].setEnabled(True)
-            for button in self.row_buttons[row_position][1:]:
-                button.setEnabled(False)
-
-    def reset_item(self, row_position):
-        item_id = self.row_to_item_ids[row_position]
-        reset_task_progress(item_id)
-        item_progress = dict((task, 0) for task in self.tasks)
-        task_widgets = self.make_task_widgets(row_position, item_progress)
-        for i, widget in enumerate(task_widgets):
-            column = i + 5
-            self.itemsTable.setCellWidget(row_position, column, widget)
-
-    def make_task_complete_label(self):
-        task_complete_label = QLabel("✓")
-        task_complete_label.setAlignment(Qt.AlignCenter)
-        return task_complete_label
-
-    def count_completed_tasks(self, item):
-        completed_tasks = 0
-        for task in self.tasks:
-            if item[task] == 1:
-                completed_tasks += 1
-        return completed_tasks
-
-    def start_worker(self, task, row_position):
-        item_id = self.row_to_item_ids[row_position]
-        identifier = self.row_to_item_identifiers[row_position]
-        project_dir = self.project_dir
-        collection_id = os.path.basename(project_dir)
-        remote_scans_dir = os.path.join(self.scan_storage_location, collection_id)
-        item = ItemUtils(project_dir, identifier, remote_scans_dir=remote_scans_dir)
-
-        self.worker = TaskWorker(item, task)
-        self.worker.signals.error.connect(self.report_error)
-        self.worker.signals.status.connect(self.report_progress)
-        self.worker.signals.success.connect(self.report_success)
-        self.worker.signals.success.connect(partial(self.update_db_on_success, row_position, task, item))
-        self.digitization_client.threadpool.start(self.worker)
-
-        self.disable_row_buttons(row_position)
+        identifier_prefix = self.identifierFilterEdit.text().strip()
+        title_text = self.titleSearchEdit.text().strip()
+        if self.value_filters or identifier_prefix or title_text:
+            self.model.fetch_all()
+        rows = self.model.filter_rows(self.value_filters, identifier_prefix, title_text)
+        self.filter_model.set_accepted_rows(rows)
+
+    def reset_item(self, item_id):
+        item_progress = dict((task, 0) for task in TASKS)
+        self.db_writer.set_progress(item_id, item_progress)
+        self.model.set_item_progress(item_id, item_progress)
+
+    def run_selected(self):
+        rows = self.filter_model.source_rows(self.itemsTable.selectionModel().selectedIndexes())
+        self.run_next_tasks(rows)
+
+    def run_visible(self):
+        self.model.fetch_all()
+        self.run_next_tasks(self.filter_model.visible_source_rows())
+
+    def run_next_tasks(self, rows):
+        queued = 0
+        for row in rows:
+            item = self.model.items[row]
+            if item["id"] in self.model.busy_item_ids:
+                continue
+            task = get_next_task(self.tasks, item)
+            if task:
+                self.start_worker(task, item["id"], item["identifier"])
+                queued += 1
+        logging.info(f"queued {queued} tasks")
+
+    def cancel_queued(self):
+        cancelled = self.dispatcher.cancel_queued()
+        for item_id, identifier, job_id in cancelled:
+            self.model.set_item_busy(item_id, False)
+        if self.dispatcher.is_idle():
+            self.projectsBtn.setEnabled(True)
+        logging.info(f"cancelled {len(cancelled)} queued tasks")
+
+    def update_task_progress(self, finished, total):
+        self.taskProgressBar.setVisible(total > 0 and finished < total)
+        self.taskProgressBar.setMaximum(total)
+        self.taskProgressBar.setValue(finished)
+
+    def start_worker(self, task, item_id, identifier):
+        self.model.set_item_busy(item_id, True)
         if self.projectsBtn.isEnabled():
             self.projectsBtn.setEnabled(False)
-        self.worker.signals.finished.connect(partial(self.set_task_states_after_thread, row_position, item_id))
+        self.dispatcher.submit(item_id, identifier, task)
 
-    def update_db_on_success(self, row_position, task, item):
-        item_id = self.row_to_item_ids[row_position]
-        update_item_progress(item_id, task)
+    def make_worker(self, item_id, identifier, task, job_id):
         if task == "rename":
-            page_count = len(item.get_tiff_filepaths())
-            update_item_page_count(item_id, page_count)
-
-    def set_task_states_after_thread(self, row_position, item_id):
-        if self.digitization_client.threadpool.activeThreadCount() == 0:
+            # the rename's own file events must not trigger another rename once the folder goes quiet
+            self.watcher.unwatch(item_id)
+        item = make_item(self.project_dir, identifier, self.digitization_client.config)
+        # rename uses the previous manifest to avoid hashing files it only renames
+        item.manifest = self.db_writer.get_item_files(item_id)
+
+        worker = TaskWorker(item, task, job_id, item_id=item_id, lease_keeper=self.digitization_client.lease_keeper)
+        worker.signals.item_progress.connect(partial(self.model.set_item_progress, item_id))
+        worker.signals.error.connect(self.report_error)
+        worker.signals.status.connect(self.report_progress)
+        worker.signals.success.connect(self.report_success)
+        worker.signals.success.connect(partial(self.update_db_on_success, item_id, task, item))
+        worker.signals.task_run.connect(partial(self.record_task_run, item_id, self.project_id))
+        return worker
+
+    def update_db_on_success(self, item_id, task, item):
+        self.db_writer.set_progress(item_id, {task: 1})
+        if task == "rename":
+            # the manifest was built in the worker thread right after renaming
+            self.db_writer.set_files(item_id, item.manifest)
+            self.db_writer.set_page_count(item_id, len(item.manifest))
+        self.succeeded_tasks[item_id] = task
+        self.model.set_item_progress(item_id, {task: 1})
+
+    def record_task_run(self, item_id, project_id, task_run):
+        self.db_writer.add_task_run(item_id, project_id, task_run)
+        self.digitization_client.schedule_metrics_export()
+
+    def set_task_states_after_thread(self, item_id, identifier):
+        if self.dispatcher.is_idle():
             self.projectsBtn.setEnabled(True)
-        item_progress = get_item_progress(item_id)
-        self.set_task_states(item_progress, row_position)
-
-    def disable_row_buttons(self, row_position):
-        for button in self.row_buttons[row_position]:
-            button.setEnabled(False)
+        succeeded_task = self.succeeded_tasks.pop(item_id, None)
+        self.model.set_item_busy(item_id, False)
+        if item_id in self.auto_derivative_item_ids:
+            self.auto_derivative_item_ids.discard(item_id)
+            if succeeded_task == "rename":
+                self.start_worker("derivatives", item_id, identifier)
 
     def report_success(self, message):
         logging.info(message)
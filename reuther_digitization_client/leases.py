@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+
+from reuther_digitization_client.database import (
+    claim_item_lease,
+    close_connection,
+    get_item_lease_owner,
+    get_item_progress,
+    get_lease_owners,
+    open_connection,
+    release_item_lease,
+    release_owner_leases,
+    renew_item_leases
+)
+
+
+def get_lease_owner(config):
+    # the process id keeps the GUI and a batch script on the same station apart
+    return f"{config.get('station_id', 'station')}:{os.getpid()}"
+
+
+def is_process_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def release_stale_leases(config):
+    # Leases left behind by a process of this station that is no longer
+    # running, e.g. after a crash, would otherwise keep their items, and the
+    # jobs on them, blocked until they expire. Leases of other stations are
+    # left to expire.
+    prefix = f"{config.get('station_id', 'station')}:"
+    released = 0
+    for owner in get_lease_owners(prefix):
+        pid = owner[len(prefix):]
+        if owner == get_lease_owner(config) or not pid.isdigit() or is_process_running(int(pid)):
+            continue
+        released += release_owner_leases(owner)
+    return released
+
+
+class LeaseKeeper:
+    # Renews the leases this process holds on items every third of
+    # lease_seconds from a thread of its own, so a long task keeps its item
+    # while a station that stopped without releasing its leases loses them
+    # within lease_seconds. Leases are claimed and released by the code that
+    # runs the tasks; the keeper only needs to know which items to renew.
+    def __init__(self, config):
+        self.owner = get_lease_owner(config)
+        self.lease_seconds = config.get("lease_seconds", 300)
+        self.connection_name = "lease-keeper"
+        self.lock = threading.Lock()
+        self.item_ids = set()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def claim(self, item_id, connection_name=None):
+        if not claim_item_lease(item_id, self.owner, self.lease_seconds, connection_name=connection_name):
+            return False
+        self.add(item_id)
+        return True
+
+    def release(self, item_id, connection_name=None):
+        self.remove(item_id)
+        release_item_lease(item_id, self.owner, connection_name=connection_name)
+
+    def add(self, item_id):
+        with self.lock:
+            self.item_ids.add(item_id)
+
+    def remove(self, item_id):
+        with self.lock:
+            self.item_ids.discard(item_id)
+
+    def run(self):
+        open_connection(self.connection_name)
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                with self.lock:
+                    item_ids = sorted(self.item_ids)
+                if not item_ids:
+                    continue
+                lost_item_ids = renew_item_leases(item_ids, self.owner, self.lease_seconds, self.connection_name)
+                with self.lock:
+                    # leases released while they were being renewed are not lost
+                    lost_item_ids = [item_id for item_id in lost_item_ids if item_id in self.item_ids]
+                for item_id in lost_item_ids:
+                    logging.warning(f"lost the lease on item {item_id}; another station may now be working on it")
+        finally:
+            close_connection(self.connection_name)
+
+    def shutdown(self):
+        self.stopped.set()
+        self.thread.join()
+
+
+def claim_next_item(waiting_items, lease_keeper, has_work, leased_items):
+    # For the batch scripts, which claim items only as workers free up so
+    # that other stations sharing the database can take the rest. Returns the
+    # next item of waiting_items this process could lease and that has_work
+    # says still needs doing, with its current progress, or (None, None).
+    # Items leased to another station are added to leased_items.
+    while waiting_items:
+        item = waiting_items.popleft()
+        if not lease_keeper.claim(item["id"]):
+            print(f"skipping {item['identifier']}: {get_item_lease_owner(item['id']) or 'another station'} is working on it")
+            leased_items.append(item["identifier"])
+            continue
+        # another station may have moved the item on since the items were loaded
+        progress = get_item_progress(item["id"])
+        if has_work(progress):
+            return item, progress
+        lease_keeper.release(item["id"])
+    return None, None
@@ -0,0 +1,88 @@
+import csv
+import os
+
+
+TASK_RUN_FIELDS = [
+    "collection_id", "identifier", "task", "started_at", "finished_at",
+    "duration", "page_count", "bytes_processed", "outcome", "error"
+]
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summarize_task_runs(task_runs):
+    groups = {}
+    for task_run in task_runs:
+        key = (task_run["collection_id"], task_run["task"])
+        groups.setdefault(key, []).append(task_run)
+    summaries = []
+    for (collection_id, task), runs in sorted(groups.items()):
+        succeeded = [run for run in runs if run["outcome"] == "success" and run["duration"] is not None]
+        durations = [run["duration"] for run in succeeded]
+        total_duration = sum(durations)
+        total_pages = sum(run["page_count"] or 0 for run in succeeded)
+        total_bytes = sum(run["bytes_processed"] or 0 for run in succeeded)
+        summary = {
+            "collection_id": collection_id,
+            "task": task,
+            "runs": len(runs),
+            "failures": len([run for run in runs if run["outcome"] != "success"]),
+            "pages_per_minute": total_pages / total_duration * 60 if total_duration else 0.0,
+            "megabytes_per_second": total_bytes / (1024 * 1024) / total_duration if total_duration else 0.0,
+            "p50_duration": percentile(durations, 0.5),
+            "p95_duration": percentile(durations, 0.95)
+        }
+        summaries.append(summary)
+    return summaries
+
+
+def write_task_runs_csv(filepath, task_runs):
+    with open(filepath, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=TASK_RUN_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(task_runs)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_prometheus_metrics(summaries):
+    metrics = [
+        ("reuther_task_runs_total", "counter", "Number of task runs", "runs"),
+        ("reuther_task_failures_total", "counter", "Number of failed task runs", "failures"),
+        ("reuther_task_pages_per_minute", "gauge", "Pages processed per minute of task time", "pages_per_minute"),
+        ("reuther_task_megabytes_per_second", "gauge", "Megabytes processed per second of task time", "megabytes_per_second")
+    ]
+    lines = []
+    for name, metric_type, description, key in metrics:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for summary in summaries:
+            labels = f'collection_id="{escape_label(summary["collection_id"])}",task="{escape_label(summary["task"])}"'
+            lines.append(f"{name}{{{labels}}} {summary[key]}")
+    name = "reuther_task_duration_seconds"
+    lines.append(f"# HELP {name} Duration of successful task runs")
+    lines.append(f"# TYPE {name} gauge")
+    for summary in summaries:
+        labels = f'collection_id="{escape_label(summary["collection_id"])}",task="{escape_label(summary["task"])}"'
+        for quantile, key in [("0.5", "p50_duration"), ("0.95", "p95_duration")]:
+            if summary[key] is not None:
+                lines.append(f'{name}{{{labels},quantile="{quantile}"}} {summary[key]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(filepath, summaries):
+    # node_exporter may read the file at any moment, so replace it atomically
+    temp_filepath = f"{filepath}.{os.getpid()}.tmp"
+    with open(temp_filepath, "w", encoding="utf-8") as f:
+        f.write(format_prometheus_metrics(summaries))
+    os.replace(temp_filepath, filepath)
@@ -0,0 +1,95 @@
+import io
+import os
+
+
+# resolution assumed for scans that do not record one
+DEFAULT_SOURCE_DPI = 600
+
+
+class StreamingPdfWriter:
+    # Writes a PDF of JPEG-encoded pages one page at a time. Only the byte
+    # offsets of the objects written so far are kept, so memory use does not
+    # grow with the number of pages.
+    def __init__(self, f):
+        self.f = f
+        self.offsets = {}
+        self.page_ids = []
+        # objects 1 and 2 are the catalog and the page tree, written last
+        self.next_id = 3
+        self.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def write(self, data):
+        self.f.write(data)
+
+    def write_object(self, object_id, body, stream=None):
+        self.offsets[object_id] = self.f.tell()
+        self.write(f"{object_id} 0 obj\n".encode())
+        self.write(body.encode())
+        if stream is not None:
+            self.write(b"\nstream\n")
+            self.write(stream)
+            self.write(b"\nendstream")
+        self.write(b"\nendobj\n")
+
+    def add_page(self, jpeg_data, width, height, color_space, page_width, page_height):
+        image_id, content_id, page_id = self.next_id, self.next_id + 1, self.next_id + 2
+        self.next_id += 3
+        self.write_object(
+            image_id,
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /{color_space} /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg_data)} >>",
+            jpeg_data
+        )
+        content = f"q {page_width:.2f} 0 0 {page_height:.2f} 0 0 cm /Im0 Do Q".encode()
+        self.write_object(content_id, f"<< /Length {len(content)} >>", content)
+        self.write_object(
+            page_id,
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_width:.2f} {page_height:.2f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self.write_object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+        self.write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>")
+        xref_offset = self.f.tell()
+        self.write(f"xref\n0 {self.next_id}\n".encode())
+        self.write(b"0000000000 65535 f \n")
+        for object_id in range(1, self.next_id):
+            self.write(f"{self.offsets[object_id]:010d} 00000 n \n".encode())
+        self.write(f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def encode_page(source_path, dpi, quality):
+    from PIL import Image
+    with Image.open(source_path) as image:
+        source_dpi = float(image.info.get("dpi", (0, 0))[0])
+        if source_dpi < 72:
+            # Pillow reports 1 dpi for TIFFs without a resolution unit
+            source_dpi = DEFAULT_SOURCE_DPI
+        page_width = image.width * 72 / source_dpi
+        page_height = image.height * 72 / source_dpi
+        if image.mode not in ["RGB", "L"]:
+            image = image.convert("RGB")
+        if source_dpi > dpi:
+            size = (max(round(image.width * dpi / source_dpi), 1), max(round(image.height * dpi / source_dpi), 1))
+            image = image.resize(size, Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality)
+        color_space = "DeviceGray" if image.mode == "L" else "DeviceRGB"
+        return buffer.getvalue(), image.width, image.height, color_space, page_width, page_height
+
+
+def build_pdf(source_paths, output_path, dpi=150, quality=75):
+    # module-level so that it can be sent to a process pool; each page is
+    # downsampled, encoded and written before the next one is opened
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f"{output_path}.part"
+    with open(temp_path, "wb") as f:
+        writer = StreamingPdfWriter(f)
+        for source_path in source_paths:
+            writer.add_page(*encode_page(source_path, dpi, quality))
+        writer.close()
+    os.replace(temp_path, output_path)
+    return output_path
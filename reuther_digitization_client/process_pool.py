@@ -0,0 +1,41 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+
+
+# Shared pool of worker processes for CPU-heavy tasks. Running them outside
+# the GUI process keeps image processing from holding the GUI's GIL.
+process_pool = None
+process_pool_lock = threading.Lock()
+
+
+def make_process_pool(max_workers):
+    # never fork a process that uses Qt; its threads and open database connections do not survive a fork
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def get_process_pool(max_workers):
+    global process_pool
+    with process_pool_lock:
+        if process_pool is None:
+            process_pool = make_process_pool(max_workers)
+        return process_pool
+
+
+def discard_broken_process_pool(pool):
+    # A worker that dies, e.g. killed for running out of memory, breaks the
+    # whole pool; dropping it lets the next task start a fresh one. Only the
+    # pool that broke is dropped, in case another task has already replaced it.
+    global process_pool
+    with process_pool_lock:
+        if process_pool is pool:
+            process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_process_pool():
+    global process_pool
+    with process_pool_lock:
+        if process_pool is not None:
+            process_pool.shutdown(wait=False, cancel_futures=True)
+            process_pool = None
@@ -1,21 +1,24 @@
 import os
 
 from functools import partial
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
         QDialog,
         QFileDialog,
         QHeaderView,
         QMessageBox,
+        QProgressDialog,
         QPushButton,
         QTableWidgetItem,
         QWidget
     )
 
-from reuther_digitization_client.database import create_item, create_project, get_projects
-from reuther_digitization_utils.project_utils import ProjectUtils
+from reuther_digitization_client.database import create_project, delete_project, get_projects, get_task_runs
+from reuther_digitization_client.metrics import summarize_task_runs, write_prometheus_textfile, write_task_runs_csv
 
 from reuther_digitization_client.ui.add_project_dialog import Ui_createProject
 from reuther_digitization_client.ui.projects import Ui_Projects
+from reuther_digitization_client.ui.throughput_dialog import Ui_throughputDialog
 
 
 class Projects(QWidget, Ui_Projects):
@@ -23,6 +26,7 @@ class Projects(QWidget, Ui_Projects):
         super().__init__(parent)
         self.setupUi(self)
         self.addProjectBtn.clicked.connect(self.add_project)
+        self.throughputBtn.clicked.connect(self.show_throughput)
         self.load_projects()
         self.digitization_client = DigitizationClient
 
@@ -57,6 +61,10 @@ class Projects(QWidget, Ui_Projects):
     def load_project(self, project_id, project_dir):
         self.digitization_client.load_items(project_id, project_dir)
 
+    def show_throughput(self):
+        dialog = Throughput(self)
+        dialog.exec()
+
 
 class AddProject(QDialog, Ui_createProject):
     def __init__(self, Projects, parent=None):
@@ -67,6 +75,7 @@ class AddProject(QDialog, Ui_createProject):
         self.importBtn.clicked.connect(self.import_project)
         self.cancelButton.clicked.connect(self.reject)
         self.digitization_client = Projects.digitization_client
+        self.import_worker = None
         default_output_dir = self.digitization_client.config.get("output_dir")
         if default_output_dir:
             self.outputDir.setText(default_output_dir)
@@ -95,12 +104,90 @@ class AddProject(QDialog, Ui_createProject):
             QMessageBox.information(self, "Error", f"Could not find directory {output_dir}. Please select an output directory")
             run_import = False
         if run_import:
+            from reuther_digitization_client.helpers import ImportWorker
+            from reuther_digitization_utils.project_utils import ProjectUtils
             project = ProjectUtils(output_dir, input_spreadsheet)
-            project_dir = project.collection_dir
+            self.project_dir = project.collection_dir
             collection_id = project.collection_id
-            project.setup_project()
-            project_id = create_project(collection_id, project_name, project_dir)
-            for item in project.items:
-                create_item(item, project_id)
-            self.digitization_client.load_items(project_id, project_dir)
-            self.accept()
+            self.project_id = create_project(collection_id, project_name, self.project_dir)
+
+            self.progress_dialog = QProgressDialog("Importing items...", "Cancel", 0, len(project.items), self)
+            self.progress_dialog.setWindowModality(Qt.WindowModal)
+            self.progress_dialog.setMinimumDuration(0)
+            self.progress_dialog.setAutoClose(False)
+            self.progress_dialog.setAutoReset(False)
+
+            self.import_worker = ImportWorker(project, self.project_id)
+            self.import_worker.signals.progress.connect(self.update_import_progress)
+            self.import_worker.signals.success.connect(self.finish_import)
+            self.import_worker.signals.cancelled.connect(self.abort_import)
+            self.import_worker.signals.error.connect(self.report_import_error)
+            self.progress_dialog.canceled.connect(self.import_worker.cancel)
+            self.importBtn.setEnabled(False)
+            self.digitization_client.threadpool.start(self.import_worker)
+
+    def update_import_progress(self, imported_items, total_items):
+        self.progress_dialog.setValue(imported_items)
+
+    def finish_import(self, message):
+        self.progress_dialog.close()
+        self.digitization_client.load_items(self.project_id, self.project_dir)
+        self.accept()
+
+    def abort_import(self):
+        self.progress_dialog.close()
+        delete_project(self.project_id)
+        self.importBtn.setEnabled(True)
+
+    def report_import_error(self, message):
+        self.abort_import()
+        QMessageBox.information(self, "Error", f"Could not import project: {message}")
+
+
+class Throughput(QDialog, Ui_throughputDialog):
+    def __init__(self, Projects, parent=None):
+        super().__init__(parent)
+        self.setupUi(self)
+        self.exportCsvBtn.clicked.connect(self.export_csv)
+        self.exportPrometheusBtn.clicked.connect(self.export_prometheus)
+        self.closeBtn.clicked.connect(self.accept)
+        self.task_runs = get_task_runs()
+        self.summaries = summarize_task_runs(self.task_runs)
+        self.load_summaries()
+
+    def load_summaries(self):
+        self.throughputTable.setRowCount(0)
+        self.throughputTable.setHorizontalHeaderLabels(["Collection ID", "Task", "Runs", "Failures", "Pages/min", "MB/s", "p50 (s)", "p95 (s)"])
+        row_position = 0
+        for summary in self.summaries:
+            self.throughputTable.insertRow(row_position)
+            values = [
+                summary["collection_id"],
+                summary["task"],
+                str(summary["runs"]),
+                str(summary["failures"]),
+                f"{summary['pages_per_minute']:.1f}",
+                f"{summary['megabytes_per_second']:.1f}",
+                self.format_duration(summary["p50_duration"]),
+                self.format_duration(summary["p95_duration"])
+            ]
+            for column, value in enumerate(values):
+                self.throughputTable.setItem(row_position, column, QTableWidgetItem(value))
+            row_position += 1
+        self.throughputTable.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.throughputTable.horizontalHeader().setStretchLastSection(True)
+
+    def format_duration(self, duration):
+        if duration is None:
+            return ""
+        return f"{duration:.1f}"
+
+    def export_csv(self):
+        filepath, _filter = QFileDialog.getSaveFileName(self, "Export task runs", "task_runs.csv", "CSV (*.csv)")
+        if filepath:
+            write_task_runs_csv(filepath, self.task_runs)
+
+    def export_prometheus(self):
+        filepath, _filter = QFileDialog.getSaveFileName(self, "Export Prometheus textfile", "reuther_digitization.prom", "Prometheus textfile (*.prom)")
+        if filepath:
+            write_prometheus_textfile(filepath, self.summaries)
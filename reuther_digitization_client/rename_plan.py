@@ -0,0 +1,87 @@
+import os
+import re
+import string
+
+
+TIFF_EXTENSIONS = (".tif", ".tiff")
+TEMP_SUFFIX = ".renaming"
+
+
+def natural_sort_key(filename):
+    # Image2.tif sorts before Image10.tif
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", filename)]
+
+
+def get_page_number(filename, identifier, pattern):
+    # the page number of a file that already has its name under pattern, or None
+    regex = ""
+    for literal, field_name, format_spec, conversion in string.Formatter().parse(pattern):
+        regex += re.escape(literal)
+        if field_name == "identifier":
+            regex += re.escape(identifier)
+        elif field_name == "page":
+            regex += r"(\d+)"
+        elif field_name is not None:
+            raise ValueError(f"rename_pattern {pattern} may only use {{identifier}} and {{page}}")
+    match = re.fullmatch(regex, filename)
+    if not match or not match.groups():
+        return None
+    page = int(match.group(1))
+    # only counts if the name is exactly what the pattern gives for that page, padding included
+    if pattern.format(identifier=identifier, page=page) != filename:
+        return None
+    return page
+
+
+def plan_renames(directory, identifier, pattern):
+    # One listing of the directory gives the complete old -> new mapping.
+    # Files that already have a name under the pattern keep it, and scans
+    # added since are numbered after the last of them, so re-running the
+    # rename only touches the files that are new.
+    with os.scandir(directory) as entries:
+        filenames = sorted(
+            (entry.name for entry in entries if entry.is_file() and entry.name.lower().endswith(TIFF_EXTENSIONS)),
+            key=natural_sort_key
+        )
+    pages = [get_page_number(filename, identifier, pattern) for filename in filenames]
+    new_filenames = [filename for filename, page in zip(filenames, pages) if page is None]
+    first_page = max([page for page in pages if page is not None], default=0) + 1
+    new_names = [pattern.format(identifier=identifier, page=page) for page in range(first_page, first_page + len(new_filenames))]
+    if len(set(new_names)) != len(new_names):
+        raise ValueError(f"rename_pattern {pattern} does not give every page a unique name")
+    plan = []
+    for old_name, new_name in zip(new_filenames, new_names):
+        plan.append({
+            "old_name": old_name,
+            "temp_name": f".{new_name}{TEMP_SUFFIX}",
+            "new_name": new_name,
+            "state": "pending"
+        })
+    return plan
+
+
+def move_to_temp_names(directory, plan):
+    # Phase one frees every target name, so a file can take a name that
+    # another file in the plan is giving up. Entries that were moved before an
+    # interruption are recognised by their temporary file.
+    for entry in plan:
+        if entry["state"] != "pending":
+            continue
+        old_path = os.path.join(directory, entry["old_name"])
+        temp_path = os.path.join(directory, entry["temp_name"])
+        if os.path.exists(old_path):
+            os.rename(old_path, temp_path)
+        elif not os.path.exists(temp_path):
+            raise FileNotFoundError(f"{entry['old_name']} is missing and was not renamed")
+
+
+def move_to_new_names(directory, plan):
+    for entry in plan:
+        temp_path = os.path.join(directory, entry["temp_name"])
+        new_path = os.path.join(directory, entry["new_name"])
+        if os.path.exists(temp_path):
+            if os.path.exists(new_path):
+                raise FileExistsError(f"Not renaming {entry['old_name']}: {entry['new_name']} already exists")
+            os.rename(temp_path, new_path)
+        elif not os.path.exists(new_path):
+            raise FileNotFoundError(f"{entry['old_name']} is missing and was not renamed")
@@ -0,0 +1,202 @@
+# Each entry upgrades the database by one version. The current version is
+# stored in PRAGMA user_version, so existing databases are upgraded in place
+# by running every migration after the version they report.
+MIGRATIONS = [
+    [
+        """
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            collection_id VARCHAR(10),
+            name VARCHAR(40),
+            project_dir VARCHAR(255)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title VARCHAR(500),
+            dates VARCHAR(500),
+            box VARCHAR(20),
+            folder VARCHAR(20),
+            identifier VARCHAR(40),
+            uri VARCHAR(50),
+            rename BOOLEAN DEFAULT 0,
+            derivatives BOOLEAN DEFAULT 0,
+            copy BOOLEAN DEFAULT 0,
+            complete BOOLEAN DEFAULT 0,
+            page_count INT DEFAULT 0,
+            project_id INTEGER NOT NULL,
+            FOREIGN KEY(project_id) REFERENCES projects(id)
+        )
+        """
+    ],
+    [
+        "CREATE INDEX IF NOT EXISTS items_project_id ON items(project_id)",
+        "CREATE INDEX IF NOT EXISTS items_identifier ON items(identifier)",
+        "CREATE INDEX IF NOT EXISTS projects_collection_id ON projects(collection_id)"
+    ],
+    [
+        # per-project totals for the Projects window, kept up to date by triggers
+        # so that listing projects does not aggregate every item
+        """
+        CREATE TABLE project_summary (
+            project_id INTEGER PRIMARY KEY,
+            total_items INT DEFAULT 0,
+            completed_items INT DEFAULT 0,
+            total_scans INT DEFAULT 0
+        )
+        """,
+        """
+        INSERT INTO project_summary (project_id, total_items, completed_items, total_scans)
+        SELECT
+            projects.id,
+            COUNT(items.id),
+            SUM(CASE WHEN items.complete=1 THEN 1 ELSE 0 END),
+            COALESCE(SUM(items.page_count), 0)
+        FROM projects
+        LEFT OUTER JOIN items on items.project_id=projects.id
+        GROUP BY projects.id
+        """,
+        """
+        CREATE TRIGGER project_summary_project_insert AFTER INSERT ON projects
+        BEGIN
+            INSERT INTO project_summary (project_id) VALUES (NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER project_summary_project_delete AFTER DELETE ON projects
+        BEGIN
+            DELETE FROM project_summary WHERE project_id=OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER project_summary_item_insert AFTER INSERT ON items
+        BEGIN
+            UPDATE project_summary SET
+                total_items=total_items + 1,
+                completed_items=completed_items + (NEW.complete=1),
+                total_scans=total_scans + COALESCE(NEW.page_count, 0)
+            WHERE project_id=NEW.project_id;
+        END
+        """,
+        """
+        CREATE TRIGGER project_summary_item_delete AFTER DELETE ON items
+        BEGIN
+            UPDATE project_summary SET
+                total_items=total_items - 1,
+                completed_items=completed_items - (OLD.complete=1),
+                total_scans=total_scans - COALESCE(OLD.page_count, 0)
+            WHERE project_id=OLD.project_id;
+        END
+        """,
+        """
+        CREATE TRIGGER project_summary_item_update AFTER UPDATE OF complete, page_count, project_id ON items
+        BEGIN
+            UPDATE project_summary SET
+                total_items=total_items - 1,
+                completed_items=completed_items - (OLD.complete=1),
+                total_scans=total_scans - COALESCE(OLD.page_count, 0)
+            WHERE project_id=OLD.project_id;
+            UPDATE project_summary SET
+                total_items=total_items + 1,
+                completed_items=completed_items + (NEW.complete=1),
+                total_scans=total_scans + COALESCE(NEW.page_count, 0)
+            WHERE project_id=NEW.project_id;
+        END
+        """
+    ],
+    [
+        # fixity manifest of each item's preservation scans, recorded after rename
+        """
+        CREATE TABLE files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            path VARCHAR(255),
+            size INT,
+            mtime REAL,
+            checksum VARCHAR(64),
+            FOREIGN KEY(item_id) REFERENCES items(id),
+            UNIQUE(item_id, path)
+        )
+        """
+    ],
+    [
+        # durable record of dispatched tasks so queued and running work survives a restart
+        """
+        CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            task VARCHAR(20),
+            state VARCHAR(20) DEFAULT 'queued',
+            attempts INT DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            last_error TEXT,
+            FOREIGN KEY(item_id) REFERENCES items(id)
+        )
+        """,
+        "CREATE INDEX jobs_state ON jobs(state)",
+        "CREATE INDEX jobs_item_id ON jobs(item_id)"
+    ],
+    [
+        # timing history of every task run, for throughput reporting
+        """
+        CREATE TABLE task_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            project_id INTEGER NOT NULL,
+            task VARCHAR(20),
+            started_at REAL,
+            finished_at REAL,
+            duration REAL,
+            page_count INT,
+            bytes_processed INT,
+            outcome VARCHAR(20),
+            error TEXT,
+            FOREIGN KEY(item_id) REFERENCES items(id)
+        )
+        """,
+        "CREATE INDEX task_runs_project_task ON task_runs(project_id, task)"
+    ],
+    [
+        # planned renames of an item's scans, so an interrupted rename can be finished
+        """
+        CREATE TABLE rename_journal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            old_name VARCHAR(255) NOT NULL,
+            temp_name VARCHAR(255) NOT NULL,
+            new_name VARCHAR(255) NOT NULL,
+            state VARCHAR(20) DEFAULT 'pending',
+            FOREIGN KEY(item_id) REFERENCES items(id)
+        )
+        """,
+        "CREATE INDEX rename_journal_item_id ON rename_journal(item_id)"
+    ],
+    [
+        # station working on an item and when its claim runs out, so stations sharing a database never run the same task twice
+        "ALTER TABLE items ADD COLUMN lease_owner VARCHAR(255)",
+        "ALTER TABLE items ADD COLUMN lease_expires REAL"
+    ],
+    [
+        # station that queued a job, so stations sharing a database only resume their own;
+        # jobs queued before this have no owner and can be resumed by any station
+        "ALTER TABLE jobs ADD COLUMN owner VARCHAR(255)"
+    ]
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Applied to every connection, from the GUI and from the command line scripts,
+# before the journal mode (WAL unless database_journal_mode says otherwise).
+# WAL lets readers and a writer work at the same time, so a batch script no
+# longer blocks the GUI, and busy_timeout makes writers wait for each other
+# instead of failing with "database is locked".
+CONNECTION_PRAGMAS = [
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000"
+]
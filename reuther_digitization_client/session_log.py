@@ -0,0 +1,44 @@
+from datetime import datetime
+import logging
+from logging.handlers import RotatingFileHandler
+import os
+
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def get_log_dir(config):
+    log_dir = config.get("log_dir")
+    if not log_dir:
+        this_dir = os.path.dirname(os.path.abspath(__file__))
+        log_dir = os.path.join(this_dir, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    return log_dir
+
+
+def remove_old_session_logs(log_dir, keep_sessions):
+    session_logs = sorted(filename for filename in os.listdir(log_dir) if filename.startswith("session-"))
+    sessions = sorted(set(filename.split(".log")[0] for filename in session_logs))
+    old_sessions = set(sessions[:-keep_sessions]) if keep_sessions > 0 else set()
+    for filename in session_logs:
+        if filename.split(".log")[0] in old_sessions:
+            os.remove(os.path.join(log_dir, filename))
+
+
+def add_session_log_handler(config):
+    # every launch writes its own size-rotated log so that nothing trimmed from the log pane is lost
+    log_dir = get_log_dir(config)
+    remove_old_session_logs(log_dir, config.get("log_keep_sessions", 30))
+    filename = f"session-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.log"
+    handler = RotatingFileHandler(
+        os.path.join(log_dir, filename),
+        maxBytes=config.get("log_max_bytes", 5 * 1024 * 1024),
+        backupCount=config.get("log_backup_count", 5),
+        encoding="utf-8"
+    )
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+    logger = logging.getLogger()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return handler
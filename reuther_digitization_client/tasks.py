@@ -0,0 +1,78 @@
+import os
+import time
+
+
+TASKS = ["rename", "derivatives", "copy", "complete"]
+
+# tasks that the GUI sends to worker processes when worker_processes is set
+PROCESS_TASKS = ["derivatives"]
+
+TASK_LABELS = {
+    "rename": "Rename Files",
+    "derivatives": "Generate Derivatives",
+    "copy": "Copy to HOLD",
+    "complete": "Complete"
+}
+
+TASK_HEADERS = {
+    "rename": "Rename",
+    "derivatives": "Derivatives",
+    "copy": "Copy",
+    "complete": "Complete"
+}
+
+
+def get_tasks(generate_derivatives):
+    if generate_derivatives:
+        return list(TASKS)
+    else:
+        return [task for task in TASKS if task != "derivatives"]
+
+
+def get_next_task(tasks, progress):
+    for task in tasks:
+        if progress[task] != 1:
+            return task
+    return None
+
+
+def get_task_settings(item, task):
+    task_settings = {
+        "copy": {"function": item.copy_item_to_remote_dir, "message": "copying files"},
+        "derivatives": {"function": item.generate_derivatives, "message": "generating derivatives"},
+        "rename": {"function": item.rename_preservation_scans, "message": "renaming files"},
+        "complete": {"function": item.check_complete, "message": "checking completeness"}
+    }
+
+    return task_settings[task]
+
+
+def make_item(project_dir, identifier, config):
+    # imported here so the GUI can start without loading the imaging libraries
+    from reuther_digitization_client.item_utils import ClientItemUtils
+    collection_id = os.path.basename(project_dir)
+    remote_scans_dir = os.path.join(config["scan_storage_location"], collection_id)
+    return ClientItemUtils(project_dir, identifier, remote_scans_dir=remote_scans_dir, config=config)
+
+
+def run_task(project_dir, identifier, config, task, manifest=None):
+    # module-level so that it can be sent to a process pool
+    item = make_item(project_dir, identifier, config)
+    if manifest:
+        item.manifest = manifest
+    started_at = time.time()
+    response = get_task_settings(item, task)["function"]()
+    finished_at = time.time()
+    task_run = {
+        "task": task,
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "duration": finished_at - started_at,
+        "outcome": "success"
+    }
+    task_run.update(item.get_run_metrics())
+    result = {"response": response, "task_run": task_run}
+    if task == "rename":
+        result["page_count"] = len(item.manifest)
+        result["files"] = item.manifest
+    return result
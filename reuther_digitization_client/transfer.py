@@ -0,0 +1,293 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+
+from reuther_digitization_client.fixity import CHUNK_SIZE, file_checksum, matches_manifest_entry
+from reuther_digitization_client.rename_plan import TIFF_EXTENSIONS
+
+
+PARTIAL_SUFFIX = ".part"
+VERIFY_MODES = ["size", "mtime", "hash"]
+# small files are sent to the destination inside this archive when bundling is enabled
+BUNDLE_NAME = "small_files.tar"
+# first member of the bundle, listing the size, mtime and checksum of every file in it
+BUNDLE_INDEX = ".bundle_index.json"
+
+
+class TransferStats:
+    def __init__(self):
+        self.files_copied = 0
+        self.files_skipped = 0
+        self.files_bundled = 0
+        self.bytes_copied = 0
+        self.elapsed = 0.0
+
+    @property
+    def bytes_per_second(self):
+        if self.elapsed > 0:
+            return self.bytes_copied / self.elapsed
+        return 0.0
+
+    def __str__(self):
+        megabytes = self.bytes_copied / (1024 * 1024)
+        rate = self.bytes_per_second / (1024 * 1024)
+        bundled = f" ({self.files_bundled} in {BUNDLE_NAME})" if self.files_bundled else ""
+        return (
+            f"copied {self.files_copied} files{bundled} ({megabytes:.1f} MB), "
+            f"skipped {self.files_skipped} unchanged files "
+            f"in {self.elapsed:.1f}s ({rate:.1f} MB/s)"
+        )
+
+
+class TransferEngine:
+    # Copies the files under source_dir to dest_dir. Files that are already
+    # present and unchanged are skipped, files are copied concurrently, a
+    # partially written file is resumed from where it stopped and every file is
+    # written under a temporary name and renamed into place once complete.
+    # Files listed in the optional fixity manifest are checked against their
+    # stored checksums rather than by reading the source file a second time.
+    # With bundle_max_file_size set, files up to that size (other than the
+    # preservation scans) are streamed into a single tar archive instead, so a
+    # share that is slow to create files pays for one file rather than
+    # thousands.
+    def __init__(self, source_dir, dest_dir, jobs=4, verify="mtime", manifest=None, bundle_max_file_size=0):
+        if verify not in VERIFY_MODES:
+            raise ValueError(f"Unknown verify mode {verify}. Expected one of {', '.join(VERIFY_MODES)}")
+        self.source_dir = source_dir
+        self.dest_dir = dest_dir
+        self.jobs = jobs
+        self.verify = verify
+        self.manifest = manifest or {}
+        self.bundle_max_file_size = bundle_max_file_size
+
+    def list_files(self):
+        relative_paths = []
+        for root, dirs, files in os.walk(self.source_dir):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.endswith(PARTIAL_SUFFIX):
+                    continue
+                filepath = os.path.join(root, filename)
+                relative_paths.append(os.path.relpath(filepath, self.source_dir))
+        return relative_paths
+
+    def get_manifest_entry(self, relative_path, source_path):
+        entry = self.manifest.get(relative_path)
+        if entry and matches_manifest_entry(source_path, entry):
+            return entry
+        return None
+
+    def is_current(self, source_path, dest_path, manifest_entry=None):
+        if not os.path.exists(dest_path):
+            return False
+        source_stat = os.stat(source_path)
+        dest_stat = os.stat(dest_path)
+        if source_stat.st_size != dest_stat.st_size:
+            return False
+        if self.verify == "size":
+            return True
+        elif self.verify == "mtime":
+            # network shares often only store timestamps to the nearest 2 seconds
+            return abs(source_stat.st_mtime - dest_stat.st_mtime) < 2
+        elif manifest_entry:
+            return manifest_entry["checksum"] == file_checksum(dest_path)
+        else:
+            return file_checksum(source_path) == file_checksum(dest_path)
+
+    def get_resume_offset(self, source_path, partial_path):
+        if not os.path.exists(partial_path):
+            return 0
+        source_stat = os.stat(source_path)
+        partial_stat = os.stat(partial_path)
+        # only trust a partial copy written after the source last changed
+        if partial_stat.st_size > source_stat.st_size or partial_stat.st_mtime < source_stat.st_mtime:
+            return 0
+        return partial_stat.st_size
+
+    def partial_matches_source(self, source_path, partial_path, checksum=None):
+        # The bytes already written are compared with the start of the source
+        # before anything is appended; once renamed into place with the
+        # source's mtime, a corrupt copy would pass the size and mtime checks.
+        with open(source_path, "rb") as source, open(partial_path, "rb") as partial:
+            for chunk in iter(lambda: partial.read(CHUNK_SIZE), b""):
+                if source.read(len(chunk)) != chunk:
+                    return False
+                if checksum:
+                    checksum.update(chunk)
+        return True
+
+    def copy_file(self, relative_path):
+        source_path = os.path.join(self.source_dir, relative_path)
+        dest_path = os.path.join(self.dest_dir, relative_path)
+        manifest_entry = self.get_manifest_entry(relative_path, source_path)
+        if self.is_current(source_path, dest_path, manifest_entry):
+            return False, 0
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        partial_path = dest_path + PARTIAL_SUFFIX
+        offset = self.get_resume_offset(source_path, partial_path)
+        checksum = hashlib.sha256() if manifest_entry else None
+        if offset and not self.partial_matches_source(source_path, partial_path, checksum):
+            offset = 0
+            checksum = hashlib.sha256() if manifest_entry else None
+        bytes_copied = 0
+        with open(source_path, "rb") as source, open(partial_path, "ab" if offset else "wb") as dest:
+            source.seek(offset)
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                dest.write(chunk)
+                if checksum:
+                    checksum.update(chunk)
+                bytes_copied += len(chunk)
+            dest.flush()
+            os.fsync(dest.fileno())
+        if os.path.getsize(partial_path) != os.path.getsize(source_path):
+            raise IOError(f"Size mismatch after copying {relative_path}")
+        if checksum:
+            if checksum.hexdigest() != manifest_entry["checksum"]:
+                os.remove(partial_path)
+                raise IOError(f"Checksum mismatch after copying {relative_path}")
+        elif self.verify == "hash" and file_checksum(partial_path) != file_checksum(source_path):
+            os.remove(partial_path)
+            raise IOError(f"Checksum mismatch after copying {relative_path}")
+        shutil.copystat(source_path, partial_path)
+        os.replace(partial_path, dest_path)
+        return True, bytes_copied
+
+    def split_bundled_files(self, relative_paths):
+        if self.bundle_max_file_size <= 0:
+            return [], relative_paths
+        bundled_paths = []
+        individual_paths = []
+        for relative_path in relative_paths:
+            source_path = os.path.join(self.source_dir, relative_path)
+            if (
+                relative_path not in self.manifest
+                and not relative_path.lower().endswith(TIFF_EXTENSIONS)
+                and os.path.getsize(source_path) <= self.bundle_max_file_size
+            ):
+                bundled_paths.append(relative_path)
+            else:
+                individual_paths.append(relative_path)
+        return bundled_paths, individual_paths
+
+    def build_bundle_index(self, relative_paths):
+        index = {}
+        for relative_path in relative_paths:
+            source_path = os.path.join(self.source_dir, relative_path)
+            stat = os.stat(source_path)
+            index[relative_path.replace(os.sep, "/")] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "checksum": file_checksum(source_path)
+            }
+        return index
+
+    def read_bundle_index(self, bundle_path):
+        try:
+            with tarfile.open(bundle_path, mode="r|") as tar:
+                member = tar.next()
+                if member is None or member.name != BUNDLE_INDEX:
+                    return None
+                return json.load(tar.extractfile(member))
+        except (OSError, tarfile.TarError, ValueError):
+            return None
+
+    def is_bundle_current(self, bundle_path, relative_paths):
+        if not os.path.exists(bundle_path):
+            return False
+        index = self.read_bundle_index(bundle_path)
+        if index is None or set(index) != {relative_path.replace(os.sep, "/") for relative_path in relative_paths}:
+            return False
+        for relative_path in relative_paths:
+            source_path = os.path.join(self.source_dir, relative_path)
+            entry = index[relative_path.replace(os.sep, "/")]
+            if self.verify == "size":
+                if os.path.getsize(source_path) != entry["size"]:
+                    return False
+            elif self.verify == "mtime":
+                if not matches_manifest_entry(source_path, entry):
+                    return False
+            elif file_checksum(source_path) != entry["checksum"]:
+                return False
+        return True
+
+    def verify_bundle(self, bundle_path, index):
+        # one sequential read of the archive checks every member against the index
+        found = set()
+        with tarfile.open(bundle_path, mode="r|") as tar:
+            for member in tar:
+                if member.name == BUNDLE_INDEX:
+                    continue
+                entry = index.get(member.name)
+                if entry is None:
+                    raise IOError(f"{BUNDLE_NAME} contains unexpected file {member.name}")
+                checksum = hashlib.sha256()
+                size = 0
+                f = tar.extractfile(member)
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    checksum.update(chunk)
+                    size += len(chunk)
+                if size != entry["size"] or checksum.hexdigest() != entry["checksum"]:
+                    raise IOError(f"Checksum mismatch for {member.name} in {BUNDLE_NAME}")
+                found.add(member.name)
+        missing = set(index) - found
+        if missing:
+            raise IOError(f"{BUNDLE_NAME} is missing {', '.join(sorted(missing))}")
+
+    def copy_bundle(self, relative_paths):
+        bundle_path = os.path.join(self.dest_dir, BUNDLE_NAME)
+        if self.is_bundle_current(bundle_path, relative_paths):
+            return False, 0
+        os.makedirs(self.dest_dir, exist_ok=True)
+        partial_path = bundle_path + PARTIAL_SUFFIX
+        index = self.build_bundle_index(relative_paths)
+        index_data = json.dumps(index, indent=1).encode()
+        with open(partial_path, "wb") as dest:
+            # streamed in large blocks, with no seeking, so it is written like any other large file
+            with tarfile.open(fileobj=dest, mode="w|", bufsize=CHUNK_SIZE, format=tarfile.PAX_FORMAT) as tar:
+                index_info = tarfile.TarInfo(BUNDLE_INDEX)
+                index_info.size = len(index_data)
+                index_info.mtime = time.time()
+                tar.addfile(index_info, io.BytesIO(index_data))
+                for relative_path in relative_paths:
+                    source_path = os.path.join(self.source_dir, relative_path)
+                    tarinfo = tar.gettarinfo(source_path, arcname=relative_path.replace(os.sep, "/"))
+                    with open(source_path, "rb") as source:
+                        tar.addfile(tarinfo, source)
+            dest.flush()
+            os.fsync(dest.fileno())
+        try:
+            self.verify_bundle(partial_path, index)
+        except (IOError, tarfile.TarError):
+            os.remove(partial_path)
+            raise
+        bytes_copied = os.path.getsize(partial_path)
+        os.replace(partial_path, bundle_path)
+        return True, bytes_copied
+
+    def run(self):
+        stats = TransferStats()
+        start = time.monotonic()
+        bundled_paths, relative_paths = self.split_bundled_files(self.list_files())
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            bundle = executor.submit(self.copy_bundle, bundled_paths) if bundled_paths else None
+            for copied, bytes_copied in executor.map(self.copy_file, relative_paths):
+                if copied:
+                    stats.files_copied += 1
+                    stats.bytes_copied += bytes_copied
+                else:
+                    stats.files_skipped += 1
+            if bundle:
+                copied, bytes_copied = bundle.result()
+                if copied:
+                    stats.files_copied += len(bundled_paths)
+                    stats.files_bundled = len(bundled_paths)
+                    stats.bytes_copied += bytes_copied
+                else:
+                    stats.files_skipped += len(bundled_paths)
+        stats.elapsed = time.monotonic() - start
+        return stats
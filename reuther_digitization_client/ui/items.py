@@ -21,11 +21,43 @@ class Ui_Items(object):
         self.verticalLayout_2.setObjectName("verticalLayout_2")
         self.verticalLayout = QtWidgets.QVBoxLayout()
         self.verticalLayout.setObjectName("verticalLayout")
-        self.itemsTable = QtWidgets.QTableWidget(Items)
-        self.itemsTable.setSizeAdjustPolicy(QtWidgets.QAbstractScrollArea.AdjustToContents)
-        self.itemsTable.setColumnCount(10)
+        self.toolbarLayout = QtWidgets.QHBoxLayout()
+        self.toolbarLayout.setObjectName("toolbarLayout")
+        self.watchCheckBox = QtWidgets.QCheckBox(Items)
+        self.watchCheckBox.setObjectName("watchCheckBox")
+        self.toolbarLayout.addWidget(self.watchCheckBox)
+        self.titleSearchEdit = QtWidgets.QLineEdit(Items)
+        self.titleSearchEdit.setClearButtonEnabled(True)
+        self.titleSearchEdit.setObjectName("titleSearchEdit")
+        self.toolbarLayout.addWidget(self.titleSearchEdit)
+        self.identifierFilterEdit = QtWidgets.QLineEdit(Items)
+        self.identifierFilterEdit.setClearButtonEnabled(True)
+        self.identifierFilterEdit.setObjectName("identifierFilterEdit")
+        self.toolbarLayout.addWidget(self.identifierFilterEdit)
+        self.clearFiltersBtn = QtWidgets.QPushButton(Items)
+        self.clearFiltersBtn.setObjectName("clearFiltersBtn")
+        self.toolbarLayout.addWidget(self.clearFiltersBtn)
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.toolbarLayout.addItem(spacerItem)
+        self.taskProgressBar = QtWidgets.QProgressBar(Items)
+        self.taskProgressBar.setProperty("value", 0)
+        self.taskProgressBar.setObjectName("taskProgressBar")
+        self.toolbarLayout.addWidget(self.taskProgressBar)
+        self.runSelectedBtn = QtWidgets.QPushButton(Items)
+        self.runSelectedBtn.setObjectName("runSelectedBtn")
+        self.toolbarLayout.addWidget(self.runSelectedBtn)
+        self.runVisibleBtn = QtWidgets.QPushButton(Items)
+        self.runVisibleBtn.setObjectName("runVisibleBtn")
+        self.toolbarLayout.addWidget(self.runVisibleBtn)
+        self.cancelQueuedBtn = QtWidgets.QPushButton(Items)
+        self.cancelQueuedBtn.setObjectName("cancelQueuedBtn")
+        self.toolbarLayout.addWidget(self.cancelQueuedBtn)
+        self.verticalLayout.addLayout(self.toolbarLayout)
+        self.itemsTable = QtWidgets.QTableView(Items)
+        self.itemsTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.itemsTable.setAlternatingRowColors(True)
+        self.itemsTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         self.itemsTable.setObjectName("itemsTable")
-        self.itemsTable.setRowCount(0)
         self.verticalLayout.addWidget(self.itemsTable)
         self.projectsBtn = QtWidgets.QPushButton(Items)
         self.projectsBtn.setObjectName("projectsBtn")
@@ -42,4 +74,12 @@ class Ui_Items(object):
     def retranslateUi(self, Items):
         _translate = QtCore.QCoreApplication.translate
         Items.setWindowTitle(_translate("Items", "Items"))
+        self.watchCheckBox.setText(_translate("Items", "Watch scan folders"))
+        self.titleSearchEdit.setPlaceholderText(_translate("Items", "Search titles"))
+        self.identifierFilterEdit.setPlaceholderText(_translate("Items", "Identifier starts with"))
+        self.clearFiltersBtn.setText(_translate("Items", "Clear Filters"))
+        self.taskProgressBar.setFormat(_translate("Items", "%v/%m tasks"))
+        self.runSelectedBtn.setText(_translate("Items", "Run Next Task for Selected"))
+        self.runVisibleBtn.setText(_translate("Items", "Run Next Task for All Visible"))
+        self.cancelQueuedBtn.setText(_translate("Items", "Cancel Queued"))
         self.projectsBtn.setText(_translate("Items", "Back to Projects"))
@@ -34,6 +34,9 @@ class Ui_Projects(object):
         self.addProjectBtn = QtWidgets.QPushButton(Projects)
         self.addProjectBtn.setObjectName("addProjectBtn")
         self.verticalLayout_2.addWidget(self.addProjectBtn)
+        self.throughputBtn = QtWidgets.QPushButton(Projects)
+        self.throughputBtn.setObjectName("throughputBtn")
+        self.verticalLayout_2.addWidget(self.throughputBtn)
         self.gridLayout.addLayout(self.verticalLayout_2, 0, 0, 1, 1)
 
         self.retranslateUi(Projects)
@@ -43,3 +46,4 @@ class Ui_Projects(object):
         _translate = QtCore.QCoreApplication.translate
         Projects.setWindowTitle(_translate("Projects", "Projects"))
         self.addProjectBtn.setText(_translate("Projects", "Add Project"))
+        self.throughputBtn.setText(_translate("Projects", "Throughput"))
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'throughput_dialog.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.4
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_throughputDialog(object):
+    def setupUi(self, throughputDialog):
+        throughputDialog.setObjectName("throughputDialog")
+        throughputDialog.resize(900, 500)
+        self.verticalLayout = QtWidgets.QVBoxLayout(throughputDialog)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.throughputTable = QtWidgets.QTableWidget(throughputDialog)
+        self.throughputTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.throughputTable.setColumnCount(8)
+        self.throughputTable.setObjectName("throughputTable")
+        self.throughputTable.setRowCount(0)
+        self.verticalLayout.addWidget(self.throughputTable)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.exportCsvBtn = QtWidgets.QPushButton(throughputDialog)
+        self.exportCsvBtn.setObjectName("exportCsvBtn")
+        self.horizontalLayout.addWidget(self.exportCsvBtn)
+        self.exportPrometheusBtn = QtWidgets.QPushButton(throughputDialog)
+        self.exportPrometheusBtn.setObjectName("exportPrometheusBtn")
+        self.horizontalLayout.addWidget(self.exportPrometheusBtn)
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout.addItem(spacerItem)
+        self.closeBtn = QtWidgets.QPushButton(throughputDialog)
+        self.closeBtn.setObjectName("closeBtn")
+        self.horizontalLayout.addWidget(self.closeBtn)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+
+        self.retranslateUi(throughputDialog)
+        QtCore.QMetaObject.connectSlotsByName(throughputDialog)
+
+    def retranslateUi(self, throughputDialog):
+        _translate = QtCore.QCoreApplication.translate
+        throughputDialog.setWindowTitle(_translate("throughputDialog", "Throughput"))
+        self.exportCsvBtn.setText(_translate("throughputDialog", "Export CSV"))
+        self.exportPrometheusBtn.setText(_translate("throughputDialog", "Export Prometheus Textfile"))
+        self.closeBtn.setText(_translate("throughputDialog", "Close"))
@@ -0,0 +1,104 @@
+import os
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+
+TIFF_EXTENSIONS = (".tif", ".tiff")
+
+
+def scan_tiffs(directory):
+    tiffs = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(TIFF_EXTENSIONS):
+                    tiffs[entry.name] = entry.stat().st_size
+    except FileNotFoundError:
+        pass
+    return tiffs
+
+
+class ItemWatcher(QObject):
+    # Watches the preservation directories of items that have not been renamed
+    # yet. Every change restarts a quiet period for that item; once nothing
+    # has been written for debounce_seconds the item is reported as ready.
+    page_count_changed = pyqtSignal(int, int)
+    item_ready = pyqtSignal(int, str)
+
+    def __init__(self, debounce_seconds=30, parent=None):
+        super().__init__(parent)
+        self.debounce_ms = int(debounce_seconds * 1000)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.watched_paths = {}
+        self.item_dirs = {}
+        self.identifiers = {}
+        self.tiffs = {}
+        self.timers = {}
+
+    def watch(self, item_id, identifier, item_dir):
+        preservation_dir = os.path.join(item_dir, "preservation")
+        self.item_dirs[item_id] = item_dir
+        self.identifiers[item_id] = identifier
+        self.tiffs[item_id] = scan_tiffs(preservation_dir)
+        # watch the item directory as well so a newly created preservation directory is picked up
+        for path in [item_dir, preservation_dir]:
+            if os.path.isdir(path) and path not in self.watched_paths:
+                self.watcher.addPath(path)
+                self.watched_paths[path] = item_id
+
+    def unwatch(self, item_id):
+        paths = [path for path, watched_id in self.watched_paths.items() if watched_id == item_id]
+        if paths:
+            self.watcher.removePaths(paths)
+        for path in paths:
+            del self.watched_paths[path]
+        timer = self.timers.pop(item_id, None)
+        if timer:
+            timer.stop()
+            timer.deleteLater()
+        self.item_dirs.pop(item_id, None)
+        self.identifiers.pop(item_id, None)
+        self.tiffs.pop(item_id, None)
+
+    def clear(self):
+        for item_id in list(self.item_dirs):
+            self.unwatch(item_id)
+
+    def on_directory_changed(self, path):
+        item_id = self.watched_paths.get(path)
+        if item_id is None:
+            return
+        preservation_dir = os.path.join(self.item_dirs[item_id], "preservation")
+        if preservation_dir not in self.watched_paths and os.path.isdir(preservation_dir):
+            self.watcher.addPath(preservation_dir)
+            self.watched_paths[preservation_dir] = item_id
+        previous_tiffs = self.tiffs[item_id]
+        self.tiffs[item_id] = scan_tiffs(preservation_dir)
+        if len(self.tiffs[item_id]) != len(previous_tiffs):
+            self.page_count_changed.emit(item_id, len(self.tiffs[item_id]))
+        self.restart_timer(item_id)
+
+    def restart_timer(self, item_id):
+        timer = self.timers.get(item_id)
+        if timer is None:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda: self.on_quiet(item_id))
+            self.timers[item_id] = timer
+        timer.start(self.debounce_ms)
+
+    def on_quiet(self, item_id):
+        if item_id not in self.item_dirs:
+            return
+        preservation_dir = os.path.join(self.item_dirs[item_id], "preservation")
+        tiffs = scan_tiffs(preservation_dir)
+        # a file that is still growing means the scanner has not finished with it
+        if tiffs != self.tiffs[item_id]:
+            self.tiffs[item_id] = tiffs
+            self.restart_timer(item_id)
+            return
+        if tiffs:
+            identifier = self.identifiers[item_id]
+            self.unwatch(item_id)
+            self.item_ready.emit(item_id, identifier)
@@ -1,64 +1,108 @@
-import os
-import sqlite3
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import sys
 
-from reuther_digitization_utils.item_utils import ItemUtils
+from reuther_digitization_client.config import load_config
+from reuther_digitization_client.database import (
+    ensure_connection,
+    get_item_files,
+    get_items_needing_task,
+    get_project_by_collection_id,
+    write_item_updates
+)
+from reuther_digitization_client.leases import LeaseKeeper, claim_next_item, release_stale_leases
+from reuther_digitization_client.process_pool import make_process_pool, shutdown_process_pool
+from reuther_digitization_client.tasks import TASKS, run_task
 
 
-def create_connection():
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    db_dir = os.path.join(base_dir, "reuther_digitization_client", "db")
-    db_file = os.path.join(db_dir, "digitization_client.sqlite")
-    connection = sqlite3.connect(db_file)
-    cursor = connection.cursor()
-    return connection, cursor
-
-
-def get_project(cursor, collection_id):
-    sql_query = "SELECT id, project_dir FROM projects WHERE collection_id=:collection_id"
-    results = cursor.execute(sql_query, {"collection_id": collection_id}).fetchall()
-    if results:
-        return results[0]
+def get_project(collection_id):
+    if not ensure_connection():
+        sys.exit("Could not open the project database")
+    project = get_project_by_collection_id(collection_id)
+    if project:
+        return project["id"], project["project_dir"]
     else:
         sys.exit(f"No project found in database for collection_id {collection_id}")
 
 
-def get_project_items(cursor, project_id):
-    sql_query = "SELECT id, identifier FROM items WHERE project_id=:project_id"
-    results = cursor.execute(sql_query, {"project_id": project_id}).fetchall()
-    return results
+def batch_generate_derivatives(collection_id, jobs=1):
+    config = load_config()
+    project_id, project_dir = get_project(collection_id)
+    # renamed items that still need derivatives, in a single query
+    items = get_items_needing_task(project_id, TASKS, "derivatives")
+    release_stale_leases(config)
+    lease_keeper = LeaseKeeper(config)
+    # items are claimed only as workers free up, so other stations sharing the database can take the rest
+    waiting_items = deque(items)
+    leased_items = []
+    failures = []
 
+    def claim_item():
+        item, _ = claim_next_item(waiting_items, lease_keeper, lambda progress: progress["derivatives"] == 0, leased_items)
+        if item:
+            print(f"generating derivatives for {item['identifier']}")
+            # the fixity manifest lets the derivative cache skip hashing unchanged scans
+            item["manifest"] = get_item_files(item["id"])
+        return item
 
-def get_item_status(cursor, item_id):
-    sql_query = "SELECT rename, derivatives, copy, complete FROM items WHERE id=:item_id"
-    result = cursor.execute(sql_query, {"item_id": item_id}).fetchone()
-    if result[0] and not result[1]:
-        return True
-    else:
-        return False
-
+    def finish_item(item, result=None, error=None):
+        # recorded in task_runs like the pipeline's runs, so batch throughput shows up in the reports
+        if error is None:
+            write_item_updates({item["id"]: {"progress": {"derivatives": 1}}}, [(item["id"], project_id, result["task_run"])])
+            print(f"derivatives generated for {item['identifier']}: {result['response']}")
+        else:
+            task_run = {"task": "derivatives", "outcome": "failed", "error": error}
+            write_item_updates({}, [(item["id"], project_id, task_run)])
+            print(f"error generating derivatives for {item['identifier']}: {error}")
+            failures.append((item["identifier"], error))
+        lease_keeper.release(item["id"])
 
-def update_status(connection, cursor, item_id):
-    sql_query = "UPDATE items SET derivatives=1 WHERE id=?"
-    cursor.execute(sql_query, (item_id,))
-    connection.commit()
+    # only this process writes to the database; workers just generate files
+    try:
+        if jobs > 1:
+            # in page mode each item already spreads its pages over the process pool
+            if config["derivative_mode"] == "pages":
+                executor = ThreadPoolExecutor(max_workers=jobs)
+            else:
+                executor = make_process_pool(jobs)
+            with executor:
+                futures = {}
+                while True:
+                    while len(futures) < jobs:
+                        item = claim_item()
+                        if item is None:
+                            break
+                        future = executor.submit(run_task, project_dir, item["identifier"], config, "derivatives", item["manifest"])
+                        futures[future] = item
+                    if not futures:
+                        break
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        item = futures.pop(future)
+                        try:
+                            finish_item(item, result=future.result())
+                        except Exception as e:
+                            finish_item(item, error=str(e))
+        else:
+            while True:
+                item = claim_item()
+                if item is None:
+                    break
+                try:
+                    result = run_task(project_dir, item["identifier"], config, "derivatives", item["manifest"])
+                except Exception as e:
+                    finish_item(item, error=str(e))
+                else:
+                    finish_item(item, result=result)
+    finally:
+        shutdown_process_pool()
+        lease_keeper.shutdown()
 
+    if leased_items:
+        print(f"{len(leased_items)} items were left to other stations: {', '.join(leased_items)}")
 
-def batch_generate_derivatives(collection_id):
-    connection, cursor = create_connection()
-    project_id, project_dir = get_project(cursor, collection_id)
-    items = get_project_items(cursor, project_id)
-    for item in items:
-        item_id = item[0]
-        item_identifier = item[1]
-        generate_derivatives = get_item_status(cursor, item_id)
-        if generate_derivatives:
-            print(f"generating derivatives for {item_identifier}")
-            try:
-                item_util = ItemUtils(project_dir, item_identifier)
-                item_util.generate_derivatives()
-                update_status(connection, cursor, item_id)
-                print(f"derivatives generated for {item_identifier}")
-            except Exception as e:
-                sys.exit(f"error: {str(e)}")
-    connection.close()
+    if failures:
+        print(f"{len(failures)} of {len(items) - len(leased_items)} items failed:")
+        for item_identifier, error in failures:
+            print(f"  {item_identifier}: {error}")
+        sys.exit(1)
@@ -0,0 +1,107 @@
+from collections import deque
+from functools import partial
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import sys
+
+from reuther_digitization_client.config import load_config
+from reuther_digitization_client.database import get_item_files, get_project_files, get_project_items, write_item_updates
+from reuther_digitization_client.leases import LeaseKeeper, claim_next_item, release_stale_leases
+from reuther_digitization_client.process_pool import make_process_pool, shutdown_process_pool
+from reuther_digitization_client.tasks import get_next_task, get_tasks, run_task
+from scripts.batch_generate_derivatives import get_project
+
+
+def make_executors(tasks, task_jobs, config):
+    executors = {}
+    for task in tasks:
+        # derivative generation is CPU-bound; every other stage mostly waits on disk or network.
+        # In page mode the pages go to the shared process pool, so items only need threads.
+        if task == "derivatives" and config["derivative_mode"] != "pages":
+            executors[task] = make_process_pool(task_jobs[task])
+        else:
+            executors[task] = ThreadPoolExecutor(max_workers=task_jobs[task])
+    return executors
+
+
+def batch_run_pipeline(collection_id, task_jobs=None):
+    config = load_config()
+    tasks = get_tasks(config["generate_derivatives"])
+    task_jobs = dict(config["task_jobs"], **(task_jobs or {}))
+
+    project_id, project_dir = get_project(collection_id)
+    # progress and fixity manifests for the whole project, one query each
+    items = get_project_items(project_id)
+    project_files = get_project_files(project_id)
+    executors = make_executors(tasks, task_jobs, config)
+    release_stale_leases(config)
+    lease_keeper = LeaseKeeper(config)
+    # items are claimed only as workers free up, so other stations sharing the database can take the rest
+    max_items = sum(task_jobs[task] for task in tasks)
+    waiting_items = deque(item for item in items if get_next_task(tasks, item))
+    leased_items = []
+    pending = {}
+    failures = []
+
+    def submit(item, task):
+        print(f"starting {task} for {item['identifier']}")
+        manifest = project_files.get(item["id"], {})
+        future = executors[task].submit(run_task, project_dir, item["identifier"], config, task, manifest)
+        pending[future] = (item, task)
+
+    def claim_items():
+        while len(pending) < max_items:
+            item, progress = claim_next_item(waiting_items, lease_keeper, partial(get_next_task, tasks), leased_items)
+            if item is None:
+                break
+            if any(item[task] != progress[task] for task in tasks):
+                item.update(progress)
+                project_files[item["id"]] = get_item_files(item["id"])
+            submit(item, get_next_task(tasks, item))
+
+    try:
+        # resume each item from the first stage whose flag is not yet set
+        claim_items()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item, task = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"error running {task} for {item['identifier']}: {str(e)}")
+                    failures.append((item["identifier"], task, str(e)))
+                    task_run = {"task": task, "outcome": "failed", "error": str(e)}
+                    write_item_updates({}, [(item["id"], project_id, task_run)])
+                    lease_keeper.release(item["id"])
+                    continue
+                update = {"progress": {task: 1}}
+                if "page_count" in result:
+                    update["page_count"] = result["page_count"]
+                if "files" in result:
+                    update["files"] = result["files"]
+                    project_files[item["id"]] = result["files"]
+                write_item_updates({item["id"]: update}, [(item["id"], project_id, result["task_run"])])
+                item[task] = 1
+                print(f"finished {task} for {item['identifier']}: {result['response']}")
+                next_task = get_next_task(tasks, item)
+                if next_task:
+                    submit(item, next_task)
+                else:
+                    lease_keeper.release(item["id"])
+            claim_items()
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True, cancel_futures=True)
+        shutdown_process_pool()
+        lease_keeper.shutdown()
+        for item, task in pending.values():
+            lease_keeper.release(item["id"])
+
+    if leased_items:
+        print(f"{len(leased_items)} items were left to other stations: {', '.join(leased_items)}")
+
+    if failures:
+        print(f"{len(failures)} tasks failed:")
+        for item_identifier, task, error in failures:
+            print(f"  {item_identifier} ({task}): {error}")
+        sys.exit(1)